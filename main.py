@@ -2,9 +2,17 @@ import os
 import sys
 import argparse
 import logging
-from scripts.process_notes import process_folder
-from scripts.file_utils import load_file_content
-from scripts.tagging import extract_reference_tags
+from scripts.process_notes import process_folder, process_paths
+from scripts.file_utils import load_file_content, DURABILITY_POLICIES
+from scripts.tagging import extract_reference_tags, configure_rate_limits, configure_response_cache
+from scripts.logging_utils import format_run_summary
+from scripts.discovery import DEFAULT_INCLUDE, DEFAULT_PRUNE_DIRS, parse_shard, in_shard, shard_path
+from scripts.watch import create_watcher, watch_folder
+from scripts.archive_io import process_archive
+from scripts.sidecar import apply_sidecar
+from scripts.batch import load_batch_results
+from scripts.scheduler import parse_order
+from scripts.git_changes import changed_notes, range_end, resolve_commit, load_last_commit, save_last_commit
 
 # Ensure the script runs from the project root
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,6 +28,19 @@ REFERENCE_FILE_PATH = os.path.join(CONFIG_DIR, "reference.md")
 PROMPT_FILE_PATH = os.path.join(CONFIG_DIR, "prompt.md")
 LOG_FILE = os.path.join(LOGS_DIR, "process_log.txt")
 NEW_TAGS_LOG = os.path.join(LOGS_DIR, "new_tags_log.txt")
+MANIFEST_FILE = os.path.join(LOGS_DIR, "manifest.json")
+GIT_STATE_FILE = os.path.join(LOGS_DIR, "git_state.json")
+INDEX_FILE = os.path.join(LOGS_DIR, "vault_index.sqlite")
+HEADER_CACHE_FILE = os.path.join(LOGS_DIR, "header_cache.json")
+SIDECAR_FILE = os.path.join(LOGS_DIR, "sidecar.ndjson")
+RESPONSE_CACHE_FILE = os.path.join(LOGS_DIR, "response_cache.sqlite")
+BATCH_REQUESTS_FILE = os.path.join(LOGS_DIR, "batch_requests.jsonl")
+
+# Counters of notes a run left untagged; the recorded git commit only advances past runs without any
+INCOMPLETE_COUNTERS = ("errors", "llm_errors", "empty_generations", "batch_failed", "batch_missing")
+
+# Vault folders that are never searched for notes (Obsidian settings, trash, attachments)
+PRUNE_DIRS = DEFAULT_PRUNE_DIRS + ("attachments",)
 
 # Configure logging to write to log files
 logging.basicConfig(
@@ -37,12 +58,133 @@ def main():
     parser.add_argument("--opt1", action="store_true", help="Merge existing YAML with AI-generated YAML.")
     parser.add_argument("--opt2", action="store_true", help="Replace existing YAML with AI-generated YAML.")
     parser.add_argument("--test", action="store_true", help="Run in test mode (bypass OpenAI API).")
+    parser.add_argument("--force", action="store_true", help="Reprocess all notes, even those unchanged since the last run.")
+    parser.add_argument("--probe", action="store_true", help="Read only the YAML header to decide whether a note can be skipped.")
+    parser.add_argument("--include", action="append", metavar="GLOB", help="Only process notes matching this glob (repeatable, default: *.md).")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="Skip notes and folders matching this glob (repeatable).")
+    parser.add_argument("--workers", type=int, default=1, help="Threads used to list directories (helps on network drives).")
+    parser.add_argument("--order", default="", metavar="POLICIES",
+                        help="Comma-separated processing priorities: missing-yaml, recent, shortest, largest-last.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and process notes as they are saved.")
+    parser.add_argument("--debounce", type=float, default=2.0, help="Seconds a note must be unchanged before --watch processes it.")
+    parser.add_argument("--poll", action="store_true", help="With --watch, poll for changes instead of using inotify.")
+    parser.add_argument("--git-changes", nargs="?", const="", metavar="RANGE",
+                        help="Only process notes changed in a git revision range (default: since the last recorded commit).")
+    parser.add_argument("--no-index", action="store_true", help="Do not update the SQLite vault metadata index.")
+    parser.add_argument("--archive", metavar="PATH", help="Process the notes inside a .zip/.tar.gz vault backup instead of NOTES_DIR.")
+    parser.add_argument("--archive-out", metavar="PATH", help="With --archive, write the results to this new archive (default: dry run).")
+    parser.add_argument("--shard", metavar="K/N", help="Only process the K-th of N deterministic shards of the vault (e.g. 1/4).")
+    parser.add_argument("--durability", choices=DURABILITY_POLICIES, default="batch",
+                        help="When to fsync rewritten notes: every file, each folder once per run (batch), or never.")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Write notes from a background thread so slow disks do not hold up the next OpenAI call.")
+    parser.add_argument("--output-root", metavar="DIR",
+                        help="Leave NOTES_DIR untouched: hardlink it into DIR and tag the notes there instead.")
+    parser.add_argument("--sidecar", action="store_true",
+                        help="Record new metadata in logs/sidecar.ndjson instead of rewriting notes.")
+    parser.add_argument("--apply-sidecar", action="store_true",
+                        help="Write the metadata recorded by --sidecar runs into the notes, then exit.")
+    parser.add_argument("--concurrency", type=int, default=1, metavar="N",
+                        help="OpenAI requests to keep in flight at once (default: 1, one note at a time).")
+    parser.add_argument("--rpm", type=int, default=0, help="OpenAI requests allowed per minute (default: learned from the API).")
+    parser.add_argument("--tpm", type=int, default=0, help="OpenAI tokens allowed per minute (default: learned from the API).")
+    parser.add_argument("--no-response-cache", action="store_true",
+                        help="Always ask OpenAI, instead of reusing replies to identical prompts from logs/response_cache.sqlite.")
+    parser.add_argument("--response-cache-mb", type=float, default=64, help="Size of the response cache before old replies are evicted.")
+    parser.add_argument("--response-cache-days", type=float, default=30, help="Days a cached response stays valid.")
+    parser.add_argument("--export-batch", nargs="?", const="", metavar="PATH",
+                        help="Write the OpenAI Batch API requests for every note that needs tagging to PATH "
+                             "(default: logs/batch_requests.jsonl) instead of calling OpenAI.")
+    parser.add_argument("--ingest-batch", metavar="PATH",
+                        help="Tag notes from a downloaded Batch API results file instead of calling OpenAI.")
+    parser.add_argument("--pack", action="store_true",
+                        help="Send several short notes per OpenAI request, so they share one copy of the reference and prompt.")
     args = parser.parse_args()
 
     if args.opt1 and args.opt2:
         print("Error: --opt1 and --opt2 cannot be used together.")
         sys.exit(1)
 
+    try:
+        order = parse_order(args.order)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+    # Each shard keeps its own logs and state so independent runs never interleave writes
+    log_file = shard_path(LOG_FILE, shard)
+    new_tags_log = shard_path(NEW_TAGS_LOG, shard)
+    manifest_file = shard_path(MANIFEST_FILE, shard)
+    git_state_file = shard_path(GIT_STATE_FILE, shard)
+    index_file = None if args.no_index else shard_path(INDEX_FILE, shard)
+    header_cache_file = shard_path(HEADER_CACHE_FILE, shard)
+    sidecar_file = shard_path(SIDECAR_FILE, shard)
+    response_cache_file = None if args.no_response_cache else shard_path(RESPONSE_CACHE_FILE, shard)
+    batch_export_file = None
+    if args.export_batch is not None:
+        batch_export_file = args.export_batch or shard_path(BATCH_REQUESTS_FILE, shard)
+    if shard:
+        logging.basicConfig(filename=log_file, level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s", force=True)
+
+    if args.archive_out and not args.archive:
+        print("Error: --archive-out requires --archive.")
+        sys.exit(1)
+
+    if args.watch and (args.git_changes is not None or args.archive):
+        print("Error: --watch cannot be used with --git-changes or --archive.")
+        sys.exit(1)
+
+    if args.output_root and (args.watch or args.git_changes is not None or args.archive):
+        print("Error: --output-root only applies to a full folder run.")
+        sys.exit(1)
+
+    if args.watch and args.force:
+        # Every write would trigger another forced pass over the same note
+        print("Error: --watch and --force cannot be used together.")
+        sys.exit(1)
+
+    if args.export_batch is not None and args.ingest_batch:
+        print("Error: --export-batch and --ingest-batch cannot be used together.")
+        sys.exit(1)
+
+    if (args.export_batch is not None or args.ingest_batch) and (args.watch or args.archive):
+        print("Error: --export-batch and --ingest-batch cannot be used with --watch or --archive.")
+        sys.exit(1)
+
+    if args.sidecar and args.archive:
+        print("Error: --sidecar cannot be used with --archive.")
+        sys.exit(1)
+
+    if shard and args.archive:
+        # Each shard would read and rewrite the whole archive
+        print("Error: --shard cannot be used with --archive.")
+        sys.exit(1)
+
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1.")
+        sys.exit(1)
+
+    if args.rpm < 0 or args.tpm < 0:
+        print("Error: --rpm and --tpm cannot be negative.")
+        sys.exit(1)
+
+    if args.apply_sidecar:
+        # Needs neither the reference nor OpenAI: only replays recorded metadata
+        stats = apply_sidecar(sidecar_file, durability=args.durability, manifest_file=manifest_file)
+        summary = format_run_summary(stats)
+        logging.info(summary)
+        print(summary)
+        return
+
     # Verify configuration files exist
     missing_files = []
     if not os.path.exists(REFERENCE_FILE_PATH):
@@ -69,6 +211,11 @@ def main():
 
     print("Loaded reference content and prompt template.")  # Debugging line
 
+    # One limiter and response cache for the whole run, shared by every OpenAI call
+    configure_rate_limits(args.rpm, args.tpm)
+    configure_response_cache(response_cache_file, max_bytes=int(args.response_cache_mb * 1024 * 1024),
+                             ttl=args.response_cache_days * 24 * 3600)
+
     # Verify the notes directory exists
     if not os.path.exists(NOTES_DIR):
         print(f"Error: Notes directory not found: {NOTES_DIR}")
@@ -76,10 +223,88 @@ def main():
 
     print("Notes directory found.")  # Debugging line
 
+    batch_results = None
+    if args.ingest_batch:
+        try:
+            batch_results = load_batch_results(args.ingest_batch)
+        except OSError as e:
+            print(f"Error reading batch results: {e}")
+            sys.exit(1)
+        print(f"Loaded {len(batch_results)} batch results from {args.ingest_batch}.")
+
+    include = tuple(args.include or DEFAULT_INCLUDE)
+    exclude = tuple(args.exclude)
+
+    if args.watch:
+        # Reference and prompt stay loaded; only notes that are saved get processed
+        watcher = create_watcher(NOTES_DIR, include, exclude, PRUNE_DIRS, polling=args.poll)
+
+        def handle_changes(paths):
+            paths = [path for path in paths if in_shard(path, NOTES_DIR, shard)]
+            stats = process_paths(paths, reference_content, prompt_template, reference_tags, args.opt1, args.opt2, args.test,
+                                  log_file, new_tags_log, manifest_file=manifest_file, probe=args.probe,
+                                  index_file=index_file, header_cache_file=header_cache_file, durability=args.durability,
+                                  write_behind=args.write_behind,
+                                  sidecar_file=sidecar_file if args.sidecar else None,
+                                  concurrency=args.concurrency, pack=args.pack)
+            summary = format_run_summary(stats)
+            logging.info(summary)
+            print(summary)
+
+        print(f"Watching {NOTES_DIR} for changes (Ctrl+C to stop)...")
+        try:
+            watch_folder(watcher, handle_changes, debounce=args.debounce)
+        except KeyboardInterrupt:
+            print("Stopped watching.")
+        finally:
+            watcher.close()
+        return
+
     try:
-        # Add debug print to see if this is reached
-        print("Calling process_folder...")  # Debugging line
-        process_folder(NOTES_DIR, reference_content, prompt_template, reference_tags, args.opt1, args.opt2, args.test, LOG_FILE, NEW_TAGS_LOG)
+        if args.archive:
+            print(f"Processing archive {args.archive}...")
+            stats = process_archive(args.archive, args.archive_out, reference_content, prompt_template, reference_tags,
+                                    args.opt1, args.opt2, args.test, log_file, new_tags_log,
+                                    include=include, exclude=exclude, prune_dirs=PRUNE_DIRS)
+        elif args.git_changes is not None:
+            rev_range = args.git_changes
+            if not rev_range:
+                last_commit = load_last_commit(git_state_file)
+                if not last_commit:
+                    print("Error: No previous commit recorded; pass a revision range to --git-changes.")
+                    sys.exit(1)
+                rev_range = f"{last_commit}..HEAD"
+
+            # Resolve the end of the range up front so commits made during the run are not skipped next time
+            end_commit = resolve_commit(NOTES_DIR, range_end(rev_range))
+            changed = [path for path in changed_notes(NOTES_DIR, rev_range, include, exclude, PRUNE_DIRS)
+                       if in_shard(path, NOTES_DIR, shard)]
+            print(f"Processing {len(changed)} notes changed in {rev_range}...")
+            stats = process_paths(changed, reference_content, prompt_template, reference_tags, args.opt1, args.opt2, args.test,
+                                  log_file, new_tags_log, manifest_file=manifest_file, force=args.force, probe=args.probe,
+                                  index_file=index_file, header_cache_file=header_cache_file, durability=args.durability,
+                                  write_behind=args.write_behind,
+                                  sidecar_file=sidecar_file if args.sidecar else None,
+                                  concurrency=args.concurrency, batch_export_file=batch_export_file,
+                                  batch_results=batch_results, pack=args.pack)
+            if not any(stats[counter] for counter in INCOMPLETE_COUNTERS) and not batch_export_file:  # Exported notes are not tagged until ingested
+                save_last_commit(git_state_file, end_commit)
+        else:
+            # Add debug print to see if this is reached
+            print("Calling process_folder...")  # Debugging line
+            stats = process_folder(NOTES_DIR, reference_content, prompt_template, reference_tags, args.opt1, args.opt2, args.test, log_file, new_tags_log,
+                                   manifest_file=manifest_file, force=args.force, probe=args.probe,
+                                   include=include, exclude=exclude, prune_dirs=PRUNE_DIRS, workers=args.workers, shard=shard,
+                                   index_file=index_file, header_cache_file=header_cache_file, order=order,
+                                   durability=args.durability, write_behind=args.write_behind, output_root=args.output_root,
+                                   sidecar_file=sidecar_file if args.sidecar else None,
+                                   concurrency=args.concurrency, batch_export_file=batch_export_file,
+                                   batch_results=batch_results, pack=args.pack)
+        summary = format_run_summary(stats)
+        logging.info(summary)
+        print(summary)
+        if batch_export_file:
+            print(f"Wrote {stats['batch_requests']} batch requests to {batch_export_file}.")
         logging.info("Processing completed successfully.")
         print("Processing completed successfully.")
     except Exception as e:
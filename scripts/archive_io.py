@@ -0,0 +1,147 @@
+import io
+import os
+import time
+import tarfile
+import zipfile
+import yaml
+from collections import Counter
+from scripts.file_utils import extract_yaml_header, render_note
+from scripts.tagging import generate_yaml_header, identify_new_tags
+from scripts.logging_utils import log_action, log_new_tags
+from scripts.discovery import matches_any, DEFAULT_INCLUDE, DEFAULT_PRUNE_DIRS
+from scripts.process_notes import skip_reason, combine_metadata
+from scripts.manifest import same_metadata
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def archive_format(archive_path):
+    """Return "zip" or "tar" for a supported archive path, raising ValueError otherwise."""
+    name = str(archive_path).lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith(TAR_SUFFIXES):
+        return "tar"
+    raise ValueError(f"Unsupported archive type: {archive_path} (expected .zip or .tar[.gz|.bz2|.xz])")
+
+
+def iter_archive_members(archive_path):
+    """
+    Stream the regular files of a zip or tar archive one at a time.
+
+    Tar archives are read sequentially, so only the current member is ever held in memory.
+
+    Yields:
+        - tuple: (name, data, mtime) with `name` using `/` separators and `data` as bytes.
+    """
+    if archive_format(archive_path) == "zip":
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, archive.read(info), time.mktime(info.date_time + (0, 0, -1))
+    else:
+        with tarfile.open(archive_path, "r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    yield member.name, archive.extractfile(member).read(), member.mtime
+
+
+class ArchiveWriter:
+    """Write members to a new zip or tar archive, choosing the format (and tar compression) from the file name."""
+
+    def __init__(self, archive_path):
+        self.format = archive_format(archive_path)
+        if self.format == "zip":
+            self.archive = zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            name = str(archive_path).lower()
+            compression = "gz" if name.endswith((".gz", ".tgz")) else "bz2" if name.endswith(".bz2") \
+                else "xz" if name.endswith(".xz") else ""
+            self.archive = tarfile.open(archive_path, f"w|{compression}")
+
+    def add(self, name, data, mtime):
+        if self.format == "zip":
+            info = zipfile.ZipInfo(name, time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(mtime)
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+def process_archive(archive_path, output_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode,
+                    log_file, new_tags_log, include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS):
+    """
+    Process the notes inside a vault backup archive without extracting it.
+
+    Every member is parsed in memory; updated notes and all other members are streamed
+    into `output_path`. With no `output_path` the run is an audit: results are only logged.
+
+    Parameters:
+        - archive_path (str): Source `.zip` or `.tar[.gz]` archive.
+        - output_path (str): Archive to write results to, or None for a dry run.
+        - Remaining parameters are as for `process_folder`.
+
+    Returns:
+        - Counter: Run counters (processed, skipped, errors).
+    """
+    stats = Counter()
+    prune_dirs = set(prune_dirs)
+    writer = ArchiveWriter(output_path) if output_path else None
+
+    try:
+        for name, data, mtime in iter_archive_members(archive_path):
+            is_note = (
+                not prune_dirs.intersection(name.split("/")[:-1])
+                and matches_any(name, include) and not matches_any(name, exclude)
+            )
+            if is_note:
+                data = _process_member(name, data, reference_content, prompt_template, reference_tags,
+                                       opt1, opt2, test_mode, log_file, new_tags_log, stats)
+            if writer is not None:
+                writer.add(name, data, mtime)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return stats
+
+
+def _process_member(name, data, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode,
+                    log_file, new_tags_log, stats):
+    """Process one note held in memory, returning the bytes to store for it."""
+    try:
+        content = data.decode("utf-8").strip()
+        yaml_header, body = extract_yaml_header(content)
+    except (UnicodeDecodeError, yaml.YAMLError) as e:
+        print(f"Error parsing {name}: {e}")
+        stats["errors"] += 1
+        return data
+    if yaml_header and not isinstance(yaml_header, dict):
+        print(f"Error: frontmatter of {name} is not a mapping; leaving the note unchanged.")
+        stats["errors"] += 1
+        return data
+
+    reason = skip_reason(yaml_header, opt1, opt2)
+    if reason:
+        log_action(log_file, reason, name)
+        stats["skipped"] += 1
+        return data
+
+    ai_metadata = generate_yaml_header(body, reference_content, prompt_template, test_mode)
+    merged_metadata, action = combine_metadata(yaml_header, ai_metadata, opt1, opt2)
+    log_action(log_file, action, name)
+    new_tags = identify_new_tags(merged_metadata.get("tags", []), reference_tags)
+    if new_tags:
+        log_new_tags(os.path.basename(name), new_tags, new_tags_log)
+    stats["processed"] += 1
+    if same_metadata(yaml_header, merged_metadata):
+        stats["unchanged_yaml"] += 1
+        return data
+    stats["written"] += 1
+    return render_note(merged_metadata, body).encode("utf-8")
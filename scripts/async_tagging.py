@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import deque
+import openai
+import yaml
+from scripts import tagging
+from scripts.tagging import generate_yaml_header, build_prompt, build_messages, parse_metadata, DEFAULT_MODEL, \
+    SYSTEM_PROMPT, RATE_LIMIT_RETRIES, TRANSIENT_ERRORS, build_packed_prompt, parse_packed_reply
+from scripts.rate_limit import estimate_tokens, COMPLETION_TOKENS
+from scripts.response_cache import response_key
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncTagger:
+    """
+    Generates YAML headers with the async OpenAI client, with at most `concurrency`
+    requests in flight at once.
+
+    Every request is isolated: an API or parsing error is reported and yields `{}` for
+    that note (as `generate_yaml_header` does), without affecting the others. Requests go
+    through `limiter`, by default the run's shared `tagging.RATE_LIMITER`, and replies are
+    reused from `cache`, by default `tagging.RESPONSE_CACHE`.
+    """
+
+    def __init__(self, reference_content, prompt_template, test_mode=False, concurrency=DEFAULT_CONCURRENCY,
+                 client=None, model=DEFAULT_MODEL, limiter=None, cache=None):
+        self.reference_content = reference_content
+        self.prompt_template = prompt_template
+        self.test_mode = test_mode
+        self.concurrency = concurrency
+        self.model = model
+        self.client = client
+        self.limiter = limiter
+        self.cache = cache
+        self.errors = 0
+        self.packed_requests = 0  # Requests that carried several notes (see `generate_many`)
+        self.pack_fallbacks = 0  # Packed replies that could not be split, so the notes were sent one by one
+        self._semaphore = None
+
+    async def generate(self, content):
+        """Generate the YAML header for one note body."""
+        if self.test_mode:
+            return generate_yaml_header(content, self.reference_content, self.prompt_template, True)
+
+        prompt = build_prompt(content, self.reference_content, self.prompt_template)
+        try:
+            return await self._complete(prompt, parse_metadata)
+        except Exception as e:  # One failed note must not take down the rest of the batch
+            self.errors += 1
+            print(f"🚨 OpenAI request failed: {e}")
+            logging.error(f"OpenAI request failed: {e}")
+            return {}
+
+    async def generate_many(self, contents):
+        """
+        Generate the YAML headers for a pack of note bodies (see `tagging.pack_notes`).
+
+        Several notes are sent as one packed request; if its reply cannot be split back
+        into notes, each note is sent on its own instead.
+
+        Returns:
+            - list: Metadata per note, in order.
+        """
+        if len(contents) > 1 and not self.test_mode:
+            self.packed_requests += 1
+            prompt = build_packed_prompt(contents, self.reference_content, self.prompt_template)
+            try:
+                return await self._complete(prompt, lambda reply: parse_packed_reply(reply, len(contents)),
+                                            completion_tokens=COMPLETION_TOKENS * len(contents))
+            except (yaml.YAMLError, ValueError) as e:
+                self.pack_fallbacks += 1
+                print(f"⚠️ Could not split packed reply, sending notes one by one: {e}")
+            except Exception as e:
+                self.errors += 1
+                print(f"🚨 OpenAI request failed: {e}")
+                logging.error(f"OpenAI request failed: {e}")
+                return [{} for _ in contents]
+        return list(await asyncio.gather(*(self.generate(content) for content in contents)))
+
+    async def _complete(self, prompt, parse, completion_tokens=COMPLETION_TOKENS):
+        """Return `parse(reply)` for a prompt, from the response cache or a new request."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)  # Bound to the running event loop
+        if self.client is None:
+            # Reads OPENAI_API_KEY / OPENAI_BASE_URL from the environment; throttling and transient errors are
+            # retried through the limiter
+            self.client = openai.AsyncOpenAI(max_retries=0)
+
+        messages = build_messages(prompt)
+        cache = self.cache or tagging.RESPONSE_CACHE
+        key = response_key(self.model, messages) if cache is not None else None
+        reply = cache.get(key) if cache is not None else None
+        if reply is not None:
+            return parse(reply)
+
+        async with self._semaphore:
+            response = await self._create(messages, estimate_tokens(SYSTEM_PROMPT + prompt, completion_tokens))
+        reply = response.choices[0].message.content
+        result = parse(reply)
+        if cache is not None:
+            cache.put(key, reply)  # Only replies that parse, so a bad one is asked for again next run
+        return result
+
+    async def _create(self, messages, estimated_tokens):
+        """Send one request through the rate limiter, as `tagging._create_completion` does."""
+        limiter = self.limiter or tagging.RATE_LIMITER
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await limiter.acquire_async(estimated_tokens)
+            try:
+                raw = await self.client.chat.completions.with_raw_response.create(model=self.model, messages=messages)
+            except openai.RateLimitError as e:
+                limiter.record_throttled(e.response.headers)
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            except TRANSIENT_ERRORS:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                limiter.back_off(attempt)
+                continue
+            response = raw.parse()
+            limiter.record(raw.headers, estimated_tokens, response.usage.total_tokens if response.usage else None)
+            return response
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+
+async def generate_in_order(jobs, generate, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Run `generate` for a stream of jobs concurrently, delivering results in job order.
+
+    Up to `2 * concurrency` jobs are started ahead of the one being delivered, so a slow
+    response only holds back delivery, not the requests behind it.
+
+    Parameters:
+        - jobs (iterable): (key, content) pairs; may be a lazy generator.
+        - generate (coroutine function): Called with each `content`.
+        - concurrency (int): Requests allowed in flight (enforced by `generate`).
+
+    Yields:
+        - tuple: (key, result) in the order the jobs were given.
+    """
+    window = deque()
+    for key, content in jobs:
+        window.append((key, asyncio.ensure_future(generate(content))))
+        while len(window) >= 2 * concurrency:
+            key, task = window.popleft()
+            yield key, await task
+    while window:
+        key, task = window.popleft()
+        yield key, await task
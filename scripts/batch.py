@@ -0,0 +1,81 @@
+import json
+import logging
+import yaml
+from scripts.tagging import build_prompt, build_messages, parse_metadata, DEFAULT_MODEL
+from scripts.response_cache import response_key
+
+BATCH_URL = "/v1/chat/completions"
+
+
+def batch_request(content, reference_content, prompt_template, model=DEFAULT_MODEL):
+    """
+    Render one note's request as a line of an OpenAI Batch API input file.
+
+    The custom id is the hash of the model and the rendered prompt (see `response_key`), so
+    it is stable across runs, identical notes share one request, and a note edited after
+    the export no longer matches its result.
+
+    Parameters:
+        - content (str): The note body to categorize.
+        - reference_content (str): The reference note content.
+        - prompt_template (str): Template for the AI prompt.
+        - model (str): Model to request.
+
+    Returns:
+        - dict: {"custom_id", "method", "url", "body"}.
+    """
+    messages = build_messages(build_prompt(content, reference_content, prompt_template))
+    return {
+        "custom_id": response_key(model, messages),
+        "method": "POST",
+        "url": BATCH_URL,
+        "body": {"model": model, "messages": messages},
+    }
+
+
+def batch_custom_id(content, reference_content, prompt_template, model=DEFAULT_MODEL):
+    """Return the custom id `batch_request` gives a note body."""
+    return response_key(model, build_messages(build_prompt(content, reference_content, prompt_template)))
+
+
+def write_request(batch_file, request):
+    """Append a request from `batch_request` to an open batch input file."""
+    batch_file.write(json.dumps(request, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_batch_results(results_file):
+    """
+    Read a Batch API output (or error) file into AI metadata per custom id.
+
+    Parameters:
+        - results_file (str): JSONL file downloaded from the provider.
+
+    Returns:
+        - dict: Parsed metadata keyed by custom id; None for requests that failed or whose
+          reply is not valid YAML, so those notes are left for a later run.
+    """
+    results = {}
+    with open(results_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+                custom_id = result["custom_id"]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Skipping malformed line {line_number} of {results_file}: {e}")
+                continue
+
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                error = result.get("error") or (response.get("body") or {}).get("error")
+                logging.error(f"Batch request {custom_id} failed: {error}")
+                results[custom_id] = None
+                continue
+            try:
+                reply = response["body"]["choices"][0]["message"]["content"]
+                results[custom_id] = parse_metadata(reply)
+            except (KeyError, IndexError, TypeError, AttributeError, yaml.YAMLError) as e:
+                print(f"⚠️ Could not parse batch reply {custom_id}: {e}")
+                results[custom_id] = None
+    return results
@@ -0,0 +1,123 @@
+import os
+import hashlib
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Notes to pick up, and vault folders that never contain notes worth processing
+DEFAULT_INCLUDE = ("*.md",)
+DEFAULT_PRUNE_DIRS = (".obsidian", ".trash", ".git")
+
+
+def matches_any(rel_path, patterns):
+    """
+    Check a path against glob patterns.
+
+    Patterns containing a `/` are matched against the path relative to the vault
+    root (e.g. `templates/*`); other patterns are matched against the name alone.
+    """
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch(rel_path, p) if "/" in p else fnmatch(name, p) for p in patterns)
+
+
+def _scan_dir(dir_path, root, include, exclude, prune_dirs):
+    """
+    List one directory, splitting its entries into matching files and subdirectories to descend into.
+
+    Returns:
+        - tuple: (files, subdirs) as lists of `os.DirEntry`, each sorted by name.
+    """
+    files, subdirs = [], []
+    try:
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        print(f"Error listing {dir_path}: {e}")
+        return files, subdirs
+
+    for entry in entries:
+        rel_path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+        if entry.is_dir(follow_symlinks=False):
+            # Prune before descending so ignored trees are never listed
+            if entry.name not in prune_dirs and not matches_any(rel_path, exclude):
+                subdirs.append(entry)
+        elif entry.is_file() and matches_any(rel_path, include) and not matches_any(rel_path, exclude):
+            files.append(entry)
+    return files, subdirs
+
+
+def iter_notes(folder_path, include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS, workers=1):
+    """
+    Yield the notes under a folder as `os.DirEntry` objects.
+
+    Entries keep the stat information gathered while listing, so callers can use
+    `entry.stat()` without another system call on most platforms.
+
+    Parameters:
+        - folder_path (str): Root folder of the vault.
+        - include (tuple): Glob patterns a file must match to be yielded.
+        - exclude (tuple): Glob patterns for files and folders to ignore.
+        - prune_dirs (tuple): Folder names that are never descended into.
+        - workers (int): Number of threads listing directories concurrently.
+          Values above 1 help on slow or networked filesystems; order is then
+          no longer deterministic across folders.
+
+    Yields:
+        - os.DirEntry: One entry per matching note.
+    """
+    prune_dirs = set(prune_dirs)
+
+    if workers <= 1:
+        pending = [folder_path]
+        while pending:
+            files, subdirs = _scan_dir(pending.pop(), folder_path, include, exclude, prune_dirs)
+            yield from files
+            pending.extend(entry.path for entry in reversed(subdirs))
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_scan_dir, folder_path, folder_path, include, exclude, prune_dirs)}
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for entry in subdirs:
+                    futures.add(executor.submit(_scan_dir, entry.path, folder_path, include, exclude, prune_dirs))
+                yield from files
+
+
+def parse_shard(value):
+    """
+    Parse a `K/N` shard specification (1-based, e.g. `2/4`).
+
+    Returns:
+        - tuple: (k, n) with 1 <= k <= n.
+    """
+    try:
+        k, n = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{value}': expected K/N, e.g. 1/4")
+    if not 1 <= k <= n:
+        raise ValueError(f"Invalid shard '{value}': K must be between 1 and N")
+    return k, n
+
+
+def shard_of(rel_path, n):
+    """Assign a path (relative to the vault root) to one of `n` shards, numbered 1..n, by a stable hash."""
+    digest = hashlib.sha1(rel_path.replace(os.sep, "/").encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % n + 1
+
+
+def in_shard(path, root, shard):
+    """Check whether a note belongs to `shard` (a (k, n) tuple); every note belongs when shard is None."""
+    if shard is None:
+        return True
+    k, n = shard
+    return shard_of(os.path.relpath(path, root), n) == k
+
+
+def shard_path(path, shard):
+    """Derive a per-shard file name, e.g. `process_log.txt` -> `process_log.shard-1-of-4.txt`."""
+    if shard is None:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.shard-{shard[0]}-of-{shard[1]}{ext}"
@@ -1,21 +1,379 @@
-import yaml
+import os
+import re
+import errno
+import shutil
+import tempfile
+import contextlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from scripts import yaml_codec
+
+# Opening frontmatter delimiter: `---` alone on the first non-blank line, allowing a BOM,
+# surrounding spaces/tabs and CRLF line endings
+_OPENING_DELIMITER = re.compile(r"\ufeff?(?:[ \t]*\r?\n)*[ \t]*---[ \t]*\r?\n")
+_BOM = b"\xef\xbb\xbf"
+_COPY_CHUNK = 1024 * 1024
+
+DURABILITY_POLICIES = ("file", "batch", "none")
+
 
 def load_file_content(file_path):
     """Load the content of a file."""
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read().strip()
 
+def find_frontmatter(content):
+    """
+    Locate YAML frontmatter in a single pass over the start of a note.
+
+    The opening delimiter must be the first non-blank line (after an optional BOM) and the
+    header ends at the next line that is `---` on its own; surrounding whitespace and CRLF
+    line endings are allowed. A `---` later in the body is never mistaken for a delimiter.
+
+    Returns:
+        - tuple: (header_start, header_end, body_start) offsets into `content`, or None if
+          there is no complete frontmatter block.
+    """
+    opening = _OPENING_DELIMITER.match(content)
+    if opening is None:
+        return None
+    header_start = pos = opening.end()
+
+    # Jump between `---` occurrences with str.find and only inspect the lines they are on
+    while True:
+        index = content.find("---", pos)
+        if index == -1:
+            return None  # Unterminated header: treated as no frontmatter
+        line_start = content.rfind("\n", 0, index) + 1
+        line_end = content.find("\n", index)
+        if line_end == -1:
+            line_end = len(content)
+        if content[line_start:line_end].strip() == "---":
+            return header_start, line_start, min(line_end + 1, len(content))
+        pos = line_end
+
 def extract_yaml_header(content):
     """Extract YAML frontmatter if it exists."""
-    if content.startswith("---"):
-        parts = content.split("---", 2)
-        if len(parts) > 2:
-            return yaml.safe_load(parts[1]), parts[2].strip()
-    return None, content.strip()
-
-def write_updated_file(file_path, metadata, body):
-    """Write the updated YAML frontmatter and content to the file."""
-    new_yaml_header = yaml.dump(metadata, default_flow_style=False, sort_keys=False).strip()
-    new_content = f"---\n{new_yaml_header}\n---\n\n{body}"
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_content)
+    span = find_frontmatter(content)
+    if span is None:
+        return None, content.strip()
+    header_start, header_end, body_start = span
+    return yaml_codec.load(content[header_start:header_end]), content[body_start:].strip()
+
+def _read_header(f):
+    """
+    Read the frontmatter block at the start of an open binary file.
+
+    Returns:
+        - tuple: (header_bytes, body_offset), or (None, None) if there is no complete frontmatter block.
+    """
+    line = f.readline()
+    if line.startswith(_BOM):
+        line = line[len(_BOM):]
+    while line and not line.strip():  # Same delimiter rules as find_frontmatter
+        line = f.readline()
+    if line.strip() != b"---" or not line.endswith(b"\n"):
+        return None, None
+
+    header_lines = []
+    for line in iter(f.readline, b""):
+        if line.strip() == b"---":
+            return b"".join(header_lines), f.tell()
+        header_lines.append(line)
+    return None, None  # Unterminated header: treated as no frontmatter
+
+def _first_line(f):
+    """
+    Find the first non-blank line of an open binary file, skipping a BOM.
+
+    Returns:
+        - tuple: (offset, line): the line's byte offset and its bytes, including the line ending.
+    """
+    f.seek(0)
+    offset = 0
+    line = f.readline()
+    if line.startswith(_BOM):
+        offset, line = len(_BOM), line[len(_BOM):]
+    while line and not line.strip():
+        offset += len(line)
+        line = f.readline()
+    return offset, line
+
+def _copy_from(src, dst, offset):
+    """Copy `src` from byte `offset` to its end onto the end of `dst`, in the kernel when possible."""
+    dst.flush()
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), _COPY_CHUNK, offset)
+                if not copied:
+                    return
+                offset += copied
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                raise
+            dst.seek(0, os.SEEK_END)  # Resume in user space after what was already copied
+    src.seek(offset)
+    shutil.copyfileobj(src, dst, _COPY_CHUNK)
+
+def probe_yaml_header(file_path):
+    """
+    Read and parse only the YAML frontmatter of a file, without loading the body.
+
+    Reads line by line up to the closing `---` delimiter, so the cost is bounded
+    by the size of the header rather than the size of the note.
+
+    Returns:
+        - tuple: (metadata, body_offset) where `body_offset` is the byte offset just
+          after the closing delimiter, or (None, None) if the file has no frontmatter.
+    """
+    with open(file_path, "rb") as f:
+        header, body_offset = _read_header(f)
+    if header is None:
+        return None, None
+    return yaml_codec.load(header.decode("utf-8")), body_offset
+
+def render_header(metadata):
+    """Render metadata as a frontmatter block, including both `---` delimiters."""
+    return f"---\n{yaml_codec.dump(metadata).strip()}\n---\n"
+
+def render_note(metadata, body):
+    """Render YAML frontmatter and body as the full text of a note."""
+    return f"{render_header(metadata)}\n{body}"
+
+def fsync_dirs(directories):
+    """Flush directory entries (completed renames) to disk; a no-op where directories cannot be opened (Windows)."""
+    if os.name == "nt":
+        return
+    for directory in directories:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def _new_file_mode():
+    """Permission bits `open()` would give a new file under the current umask."""
+    try:
+        with open("/proc/self/status", "r") as f:  # Linux: read the umask without changing it
+            umask = next(int(line.split()[1], 8) for line in f if line.startswith("Umask:"))
+    except (OSError, StopIteration, ValueError, IndexError):
+        umask = os.umask(0)  # Elsewhere it can only be queried by setting it
+        os.umask(umask)
+    return 0o666 & ~umask
+
+@contextlib.contextmanager
+def atomic_output(dest_path, durability="file", pending_dirs=None):
+    """
+    Open a temporary file next to `dest_path` that replaces it in a single rename once the block completes.
+
+    Readers and crashes never see a partly written note: either the old or the new file is in place.
+    If the block raises, the temporary file is removed and `dest_path` is left untouched.
+
+    Parameters:
+        - dest_path (str): File to create or replace; an existing file's permissions are kept.
+        - durability (str): One of `DURABILITY_POLICIES`:
+            - "file": fsync the new file and its directory before returning (slowest, fully durable).
+            - "batch": fsync the new file but add its directory to `pending_dirs`, for the caller to flush
+              once with `fsync_dirs` at the end of a batch (fsynced immediately if `pending_dirs` is None).
+            - "none": leave flushing to the operating system.
+        - pending_dirs (set): Directories awaiting an fsync under the "batch" policy.
+
+    Yields:
+        - file: The temporary file, opened for binary writing.
+    """
+    if durability not in DURABILITY_POLICIES:
+        raise ValueError(f"Unknown durability policy: {durability} (choose from {', '.join(DURABILITY_POLICIES)})")
+    directory = os.path.dirname(os.path.abspath(dest_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            if durability != "none":  # Data reaches the disk before the rename, so a crash cannot leave an empty note
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(dest_path):
+            shutil.copymode(dest_path, tmp_path)
+        else:
+            os.chmod(tmp_path, _new_file_mode())  # As if created with open()
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+    if durability == "file" or (durability == "batch" and pending_dirs is None):
+        fsync_dirs([directory])
+    elif durability == "batch":
+        pending_dirs.add(directory)
+
+def rewrite_header(file_path, metadata, dest_path=None, durability="file", pending_dirs=None):
+    """
+    Replace only the frontmatter of a note, copying the body bytes through untouched.
+
+    The new note is assembled in a temporary file next to the destination and moved into
+    place (see `atomic_output`), so memory and CPU cost depend on the header size only.
+    A note without frontmatter gets the header prepended, separated by a blank line;
+    only its leading BOM and blank lines are dropped. The header uses the line ending
+    of the note's first line, so CRLF notes stay CRLF throughout.
+
+    Parameters:
+        - file_path (str): Note to read the body from.
+        - metadata (dict): Metadata for the new header.
+        - dest_path (str): Where to write the result; defaults to `file_path`.
+        - durability (str), pending_dirs (set): Flushing policy, as for `atomic_output`.
+
+    Returns:
+        - str: The frontmatter block that was written, with `\n` line endings. For a note without
+          frontmatter, the blank line and the indentation of its first line follow, so the result
+          is what `rewritten_content` puts in front of the note's stripped content.
+    """
+    dest_path = dest_path or file_path
+    header = render_header(metadata)
+    with open(file_path, "rb") as src:
+        _, body_offset = _read_header(src)
+        first_offset, first_line = _first_line(src)
+        newline = "\r\n" if first_line.endswith(b"\r\n") else "\n"
+        prefix = header
+        if body_offset is None:
+            body_offset = first_offset
+            header += "\n"
+            # load_file_content strips the indentation of the first line, but the note keeps it
+            prefix = header + first_line[:len(first_line) - len(first_line.lstrip())].decode("utf-8")
+
+        with atomic_output(dest_path, durability, pending_dirs) as dst:
+            dst.write(header.replace("\n", newline).encode("utf-8"))
+            _copy_from(src, dst, body_offset)
+        if os.path.abspath(dest_path) != os.path.abspath(file_path):
+            shutil.copymode(file_path, dest_path)
+    return prefix
+
+def rewritten_content(content, header):
+    """
+    Return the stripped text a note has after `rewrite_header`, without reading it back.
+
+    Parameters:
+        - content (str): The note's stripped content before the rewrite (as from `load_file_content`).
+        - header (str): The text returned by `rewrite_header`.
+    """
+    span = find_frontmatter(content)
+    body = content[span[2]:] if span else content.lstrip("\ufeff").lstrip()
+    return (header + body).strip()
+
+def write_updated_file(file_path, metadata, body, durability="file", pending_dirs=None):
+    """
+    Write the updated YAML frontmatter to a note, atomically.
+
+    An existing note only has its header replaced (see `rewrite_header`) and keeps its body
+    bytes exactly as they are on disk; `body` is only used to create a note that does not exist yet.
+    `durability` and `pending_dirs` are as for `atomic_output`.
+
+    Returns:
+        - str: The frontmatter block that was written.
+    """
+    if os.path.exists(file_path):
+        return rewrite_header(file_path, metadata, durability=durability, pending_dirs=pending_dirs)
+    with atomic_output(file_path, durability, pending_dirs) as f:
+        f.write(render_note(metadata, body).encode("utf-8"))
+    return render_header(metadata)
+
+class FrontmatterTable:
+    """
+    Columnar frontmatter for many notes, as returned by `parse_many`.
+
+    Row `i` describes `paths[i]`. Every frontmatter key has one list in `columns`, holding
+    each note's value or None. Tags are interned rather than stored per note: `tag_names`
+    maps tag ids to names, and the ids of note `i` are `tag_ids[tag_offsets[i]:tag_offsets[i + 1]]`.
+    Notes that could not be read or parsed are listed in `errors` with an empty row.
+    """
+
+    __slots__ = ("paths", "has_header", "columns", "tag_names", "tag_ids", "tag_offsets", "errors", "_tag_lookup")
+
+    def __init__(self):
+        self.paths = []
+        self.has_header = []
+        self.columns = {}
+        self.tag_names = []
+        self.tag_ids = array("I")
+        self.tag_offsets = array("I", [0])
+        self.errors = {}
+        self._tag_lookup = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def append(self, path, metadata, error=None):
+        """Add one note's row."""
+        row = len(self.paths)
+        self.paths.append(path)
+        self.has_header.append(isinstance(metadata, dict))
+        if error is not None:
+            self.errors[path] = error
+        metadata = metadata if isinstance(metadata, dict) else {}
+
+        for key, value in metadata.items():
+            if key == "tags":
+                continue
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [None] * row
+            column.append(value)
+        for column in self.columns.values():
+            if len(column) == row:
+                column.append(None)
+
+        tags = metadata.get("tags") or []
+        for tag in [tags] if isinstance(tags, str) else tags:
+            tag = str(tag)
+            tag_id = self._tag_lookup.get(tag)
+            if tag_id is None:
+                tag_id = self._tag_lookup[tag] = len(self.tag_names)
+                self.tag_names.append(tag)
+            self.tag_ids.append(tag_id)
+        self.tag_offsets.append(len(self.tag_ids))
+
+    def tags(self, row):
+        """Return the tag names of one note."""
+        return [self.tag_names[tag_id] for tag_id in self.tag_ids[self.tag_offsets[row]:self.tag_offsets[row + 1]]]
+
+    def rows_with_tag(self, tag):
+        """Return the rows of notes carrying `tag`."""
+        tag_id = self._tag_lookup.get(tag)
+        if tag_id is None:
+            return []
+        offsets = self.tag_offsets
+        return [row for row in range(len(self.paths)) if tag_id in self.tag_ids[offsets[row]:offsets[row + 1]]]
+
+def _parse_header_safe(path):
+    """Parse one note's frontmatter for `parse_many`, returning (metadata, error) instead of raising."""
+    try:
+        metadata, _ = probe_yaml_header(path)
+    except Exception as e:  # Reported per note, so one broken file does not fail the batch
+        return None, f"{type(e).__name__}: {e}"
+    return metadata, None
+
+def parse_many(paths, workers=None):
+    """
+    Parse the frontmatter of many notes in parallel, reading only their headers.
+
+    Parameters:
+        - paths (iterable): Paths of the notes to parse.
+        - workers (int): Worker processes; 1 parses in this process, None uses one per CPU.
+
+    Returns:
+        - FrontmatterTable: One row per path, in the order given.
+    """
+    paths = [str(path) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    table = FrontmatterTable()
+    if workers == 1 or len(paths) < 2:
+        results = map(_parse_header_safe, paths)
+        for path, (metadata, error) in zip(paths, results):
+            table.append(path, metadata, error)
+        return table
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, (metadata, error) in zip(paths, executor.map(_parse_header_safe, paths, chunksize=chunksize)):
+            table.append(path, metadata, error)
+    return table
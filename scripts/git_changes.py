@@ -0,0 +1,72 @@
+import os
+import json
+import subprocess
+from scripts.discovery import matches_any, DEFAULT_INCLUDE, DEFAULT_PRUNE_DIRS
+
+
+def run_git(repo_dir, *args):
+    """Run a git command in `repo_dir` and return its stdout, raising RuntimeError with git's message on failure."""
+    try:
+        result = subprocess.run(["git", "-C", repo_dir, *args], capture_output=True, text=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError("git is not installed or not on PATH")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"git {' '.join(args)} failed: {e.stderr.strip()}")
+    return result.stdout
+
+
+def range_end(rev_range):
+    """Return the revision a range ends at (`A..B` -> `B`), defaulting to HEAD."""
+    for separator in ("...", ".."):
+        if separator in rev_range:
+            return rev_range.split(separator, 1)[1] or "HEAD"
+    return "HEAD"
+
+
+def resolve_commit(repo_dir, rev):
+    """Resolve a revision name to a full commit hash."""
+    return run_git(repo_dir, "rev-parse", "--verify", f"{rev}^{{commit}}").strip()
+
+
+def changed_notes(notes_dir, rev_range, include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS):
+    """
+    List notes added, modified or renamed in a revision range.
+
+    Paths are limited to `notes_dir` and filtered with the same rules as folder discovery.
+
+    Parameters:
+        - notes_dir (str): Notes folder inside a git work tree.
+        - rev_range (str): Any range `git diff` accepts, e.g. `v1.0..HEAD` or `abc123`.
+
+    Returns:
+        - list: Absolute paths of changed notes that still exist, in git's order.
+    """
+    output = run_git(notes_dir, "diff", "--name-only", "-z", "--diff-filter=AMR", "--relative", rev_range, "--")
+    prune_dirs = set(prune_dirs)
+    notes = []
+    for rel_path in filter(None, output.split("\0")):
+        if prune_dirs.intersection(rel_path.split("/")[:-1]):
+            continue
+        if not matches_any(rel_path, include) or matches_any(rel_path, exclude):
+            continue
+        path = os.path.join(notes_dir, *rel_path.split("/"))
+        if os.path.exists(path):  # Deleted again in the working tree since
+            notes.append(path)
+    return notes
+
+
+def load_last_commit(state_file):
+    """Return the last commit recorded by a git change-set run, or None."""
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("last_commit")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def save_last_commit(state_file, commit):
+    """Record the commit the next git change-set run should start from."""
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump({"last_commit": commit}, f)
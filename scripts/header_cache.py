@@ -0,0 +1,86 @@
+import os
+import json
+from collections import OrderedDict
+from scripts import yaml_codec
+
+DEFAULT_MAX_ENTRIES = 50000
+
+
+class HeaderCache:
+    """
+    On-disk LRU cache of parsed frontmatter, keyed by note path and validated
+    against (inode, mtime_ns, size) so an edited note is never served stale metadata.
+
+    Only `--probe` runs consult it; `max_entries` caps the number of notes kept, not bytes.
+    Stored as JSON (never pickle, since `logs/` may sit on a shared mount); metadata that
+    JSON cannot hold exactly, such as dates, is kept as YAML text instead.
+    """
+
+    def __init__(self, cache_file=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if cache_file and os.path.exists(cache_file):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    for path, ino, mtime_ns, size, stored in json.load(f):  # Least recently used first
+                        self.entries[path] = ((ino, mtime_ns, size), _decode(stored))
+            except Exception:
+                self.entries = OrderedDict()  # A corrupt cache only costs a reparse
+
+    @staticmethod
+    def stat_key(stat):
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def get(self, file_path, stat):
+        """
+        Look up the cached metadata for a note.
+
+        Returns:
+            - tuple: (found, metadata); `metadata` is None for a cached note without a header.
+        """
+        file_path = os.path.abspath(file_path)
+        entry = self.entries.get(file_path)
+        if entry is None or entry[0] != self.stat_key(stat):
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(file_path)
+        self.hits += 1
+        return True, entry[1]
+
+    def put(self, file_path, stat, metadata):
+        """Cache the metadata for a note, evicting the least recently used entries beyond `max_entries`."""
+        file_path = os.path.abspath(file_path)
+        self.entries[file_path] = (self.stat_key(stat), metadata)
+        self.entries.move_to_end(file_path)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self._dirty = True
+
+    def save(self):
+        """Write the cache back to disk if anything was added."""
+        if not self.cache_file or not self._dirty:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump([[path, *key, _encode(metadata)] for path, (key, metadata) in self.entries.items()],
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
+
+
+def _encode(metadata):
+    """Store metadata as JSON if it comes back unchanged, otherwise as YAML text."""
+    try:
+        if json.loads(json.dumps(metadata)) == metadata:
+            return {"json": metadata}
+    except (TypeError, ValueError):
+        pass  # e.g. dates
+    return {"yaml": yaml_codec.dump(metadata)}
+
+
+def _decode(stored):
+    return stored["json"] if "json" in stored else yaml_codec.load(stored["yaml"])
@@ -17,3 +17,9 @@ def log_new_tags(file_path, new_tags, log_file="new_tags_log.txt"):
     with open(log_file_path, "a", encoding="utf-8") as log:
         # Then write the file name and the tags
         log.write(f"New Tags in {file_name}: {', '.join(new_tags)}\n\n")
+
+def format_run_summary(stats):
+    """Format run counters as a single summary line, e.g. `processed=3, unchanged=12`."""
+    if not stats:
+        return "Run summary: nothing to do"
+    return "Run summary: " + ", ".join(f"{key}={value}" for key, value in sorted(stats.items()))
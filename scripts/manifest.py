@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+
+
+def hash_text(text):
+    """Return a stable SHA-256 hex digest of a string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def config_version(reference_content, prompt_template):
+    """
+    Fingerprint the configuration a note was processed with.
+
+    A change to `reference.md` or `prompt.md` changes the version, so notes
+    processed under the old configuration are picked up again on the next run.
+    """
+    return hash_text(reference_content + "\0" + prompt_template)[:16]
+
+
+def run_mode(opt1, opt2, test_mode):
+    """Describe the processing mode so entries from different modes are not mixed."""
+    mode = "merge" if opt1 else "replace" if opt2 else "add"
+    return f"{mode}-test" if test_mode else mode
+
+
+def canonical_metadata(metadata):
+    """
+    Serialise metadata in a canonical form, so equivalent headers compare equal.
+
+    Mapping keys are sorted, and lists are treated as unordered and de-duplicated
+    (tag order is not meaningful, and merged tag lists come back in arbitrary order).
+    A missing header is equivalent to an empty one.
+    """
+    def normalise(value):
+        if isinstance(value, dict):
+            return {str(key): normalise(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple, set)):
+            items = {json.dumps(normalise(item), sort_keys=True, default=str) for item in value}
+            return [json.loads(item) for item in sorted(items)]
+        return value
+
+    return json.dumps(normalise(metadata or {}), sort_keys=True, default=str)
+
+
+def same_metadata(old_metadata, new_metadata):
+    """Check whether two headers are semantically identical (see `canonical_metadata`)."""
+    return canonical_metadata(old_metadata) == canonical_metadata(new_metadata)
+
+
+def frontmatter_hash(metadata):
+    """Hash parsed YAML metadata, or return None when the note has no header."""
+    if not metadata:
+        return None
+    return hash_text(canonical_metadata(metadata))
+
+
+def load_manifest(manifest_file):
+    """
+    Load the run manifest from disk.
+
+    Returns an empty manifest if the file does not exist or cannot be parsed,
+    so a corrupt manifest only costs a full rerun.
+    """
+    if not manifest_file or not os.path.exists(manifest_file):
+        return {}
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save_manifest(manifest_file, manifest):
+    """Write the run manifest, replacing the previous one in a single step."""
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+
+def manifest_key(file_path):
+    """Key manifest entries by absolute, normalised note path."""
+    return os.path.normpath(os.path.abspath(file_path))
+
+
+def is_unchanged(manifest, file_path, content_hash, version, mode):
+    """
+    Check whether a note is identical to when it was last handled.
+
+    Parameters:
+        - manifest (dict): The loaded run manifest.
+        - file_path (str): Path to the note.
+        - content_hash (str): Hash of the note's current content.
+        - version (str): Current configuration version.
+        - mode (str): Current processing mode.
+
+    Returns:
+        - bool: True if the note can be skipped without calling the LLM.
+    """
+    entry = manifest.get(manifest_key(file_path))
+    if not entry:
+        return False
+    return (
+        entry.get("content_hash") == content_hash
+        and entry.get("version") == version
+        and entry.get("mode") == mode
+    )
+
+
+def record_result(manifest, file_path, content_hash, metadata, version, mode, result):
+    """Record the outcome for a note so the next run can skip it if unchanged."""
+    manifest[manifest_key(file_path)] = {
+        "content_hash": content_hash,
+        "frontmatter_hash": frontmatter_hash(metadata),
+        "version": version,
+        "mode": mode,
+        "result": result,
+    }
@@ -0,0 +1,89 @@
+import os
+import sys
+import shutil
+from collections import Counter
+from scripts.discovery import iter_notes
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Folders not carried over into a mirror (a hardlinked git object store is of no use)
+MIRROR_SKIP_DIRS = (".git",)
+
+FICLONE = 0x40049409  # Linux ioctl: share all blocks of one file with another (btrfs, XFS, ...)
+
+
+def clone_file(src, dest):
+    """
+    Copy a file, sharing its data blocks (a reflink) when the filesystem supports it.
+
+    Returns:
+        - str: "reflink" or "copy".
+    """
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            with open(src, "rb") as s, open(dest, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            shutil.copystat(src, dest)
+            return "reflink"
+        except OSError:
+            pass  # Not supported here: fall back to copying the bytes
+    shutil.copy2(src, dest)
+    return "copy"
+
+
+def link_file(src, dest):
+    """
+    Place `src` at `dest` without copying data where possible: a hardlink, else a reflink, else a copy.
+
+    An existing `dest` is replaced in one step, unless it already is a link to `src`.
+
+    Returns:
+        - str: "hardlink", "reflink", "copy", or "unchanged".
+    """
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        return "unchanged"
+    tmp_dest = f"{dest}.{os.getpid()}.mirror-tmp"
+    try:
+        os.link(src, tmp_dest)
+        method = "hardlink"
+    except OSError:
+        method = clone_file(src, tmp_dest)
+    os.replace(tmp_dest, dest)
+    return method
+
+
+def mirror_tree(source_root, output_root, skip_dirs=MIRROR_SKIP_DIRS):
+    """
+    Make `output_root` a zero-copy mirror of `source_root`: every note and attachment is hardlinked
+    (or reflinked, or copied across filesystems) to the same relative path.
+
+    Notes are only ever rewritten with an atomic replace, which gives the mirror copy its own inode,
+    so processing the mirror never touches the source files. Files in the mirror that differ from the
+    source (e.g. notes tagged by an earlier experiment) are reset to the source version; files that
+    only exist in the mirror are left alone.
+
+    Parameters:
+        - source_root (str): The vault to mirror.
+        - output_root (str): The mirror directory; created if missing. Must not be inside the vault.
+        - skip_dirs (tuple): Folder names that are not mirrored.
+
+    Returns:
+        - Counter: Files placed, by method (mirror_hardlink, mirror_reflink, mirror_copy, mirror_unchanged).
+    """
+    source_root, output_root = os.path.realpath(source_root), os.path.realpath(output_root)
+    if output_root == source_root or output_root.startswith(source_root + os.sep):
+        raise ValueError(f"The output root must be outside the notes folder: {output_root}")
+
+    stats = Counter()
+    created_dirs = set()
+    for entry in iter_notes(source_root, include=("*",), prune_dirs=skip_dirs):
+        dest = os.path.join(output_root, os.path.relpath(entry.path, source_root))
+        dest_dir = os.path.dirname(dest)
+        if dest_dir not in created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            created_dirs.add(dest_dir)
+        stats[f"mirror_{link_file(entry.path, dest)}"] += 1
+    return stats
@@ -0,0 +1,110 @@
+import os
+from scripts import yaml_codec
+from scripts.file_utils import load_file_content, find_frontmatter, probe_yaml_header
+
+_UNSET = object()
+
+
+class Note:
+    """
+    A note as it moves through the pipeline: created once per file at discovery and passed
+    through scheduling, classification, merge and write.
+
+    Only the path is needed up front. The stat, text, header span, metadata and body are
+    filled in on first use (or set by the pipeline as it computes them), and `release_body`
+    drops the text again, so metadata for a whole vault can be kept in memory without the
+    note bodies. `__slots__` keeps every instance to a handful of pointers.
+    """
+
+    __slots__ = ("path", "name", "content", "_stat", "_entry", "_header_span", "_metadata", "_body")
+
+    def __init__(self, path, stat=None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.content = None  # Stripped note text, once loaded
+        self._stat = stat
+        self._entry = None  # `os.DirEntry` to stat through, until the stat is needed
+        self._header_span = _UNSET
+        self._metadata = _UNSET
+        self._body = None
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Create a note from an `os.DirEntry`, keeping it to reuse the stat the scan may already have cached."""
+        note = cls(entry.path)
+        note._entry = entry
+        return note
+
+    def __repr__(self):
+        return f"Note({self.path!r})"
+
+    def stat(self):
+        """Return the note's `os.stat_result`, fetched on first use (same interface as `os.DirEntry.stat`)."""
+        if self._stat is None:
+            entry, self._entry = self._entry, None
+            self._stat = entry.stat() if entry is not None else os.stat(self.path)
+        return self._stat
+
+    def load(self):
+        """Read the note text, returning it."""
+        self.set_content(load_file_content(self.path))
+        return self.content
+
+    def set_content(self, content):
+        """Attach already loaded (stripped) note text, discarding anything derived from older text."""
+        self.content = content
+        self._header_span = _UNSET
+        self._metadata = _UNSET
+        self._body = None
+
+    @property
+    def header_span(self):
+        """(header_start, header_end, body_start) offsets into `content`, or None without frontmatter."""
+        if self._header_span is _UNSET:
+            self._header_span = find_frontmatter(self.content if self.content is not None else self.load())
+        return self._header_span
+
+    @property
+    def metadata(self):
+        """The parsed frontmatter, or None; read from the header alone if the text is not loaded."""
+        if self._metadata is _UNSET:
+            if self.content is None:
+                self._metadata, _ = probe_yaml_header(self.path)
+            else:
+                span = self.header_span
+                self._metadata = yaml_codec.load(self.content[span[0]:span[1]]) if span else None
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, metadata):
+        self._metadata = metadata
+
+    @property
+    def body(self):
+        """The stripped note body, loading the text if needed."""
+        if self._body is None:
+            span = self.header_span
+            self._body = self.content[span[2]:].strip() if span else self.content.strip()
+        return self._body
+
+    @body.setter
+    def body(self, body):
+        self._body = body
+
+    def written(self, metadata):
+        """Record that the note was rewritten with `metadata`: the cached stat is stale, the text is not needed."""
+        self._stat = None
+        self._entry = None  # Its cached stat is stale too
+        self._metadata = metadata
+        self.release_body()
+
+    def release_body(self):
+        """Drop the note text and body, keeping the path, stat and metadata."""
+        self.content = None
+        self._header_span = _UNSET
+        self._body = None
+
+
+def as_note(note_or_path):
+    """Accept either a `Note` or a plain path, as the pipeline entry points do."""
+    return note_or_path if isinstance(note_or_path, Note) else Note(note_or_path)
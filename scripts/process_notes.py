@@ -1,9 +1,27 @@
 import os
 import yaml
+import asyncio
 import logging
-from scripts.file_utils import load_file_content, extract_yaml_header, write_updated_file
-from scripts.tagging import generate_yaml_header, identify_new_tags
+import sqlite3
+from collections import Counter
+from scripts.file_utils import load_file_content, extract_yaml_header, probe_yaml_header, write_updated_file, \
+    rewritten_content, fsync_dirs
+from scripts import tagging, yaml_codec
+from scripts.tagging import generate_yaml_header, generate_packed_headers, pack_notes, identify_new_tags
 from scripts.logging_utils import log_action, log_new_tags
+from scripts.discovery import iter_notes, in_shard, DEFAULT_INCLUDE, DEFAULT_PRUNE_DIRS
+from scripts.vault_index import open_index, update_note, indexed_metadata, prune_missing
+from scripts.header_cache import HeaderCache
+from scripts.write_behind import WriteBehind
+from scripts.async_tagging import AsyncTagger, generate_in_order
+from scripts.note import Note, as_note
+from scripts.mirror import mirror_tree
+from scripts.sidecar import open_sidecar, append_entry
+from scripts.batch import batch_request, batch_custom_id, write_request
+from scripts.scheduler import schedule
+from scripts.manifest import (
+    hash_text, config_version, run_mode, load_manifest, save_manifest, is_unchanged, record_result, same_metadata
+)
 
 
 def merge_yaml_headers(existing_yaml, new_yaml):
@@ -42,12 +60,135 @@ def merge_yaml_headers(existing_yaml, new_yaml):
     return merged_yaml
 
 
-def process_file(file_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log):
+def combine_metadata(yaml_header, ai_metadata, opt1, opt2):
+    """
+    Combine a note's existing YAML header with AI-generated metadata according to the processing mode.
+
+    Returns:
+        - tuple: (metadata, action) where `action` is the log message for the change.
+    """
+    if yaml_header and opt1:
+        return merge_yaml_headers(yaml_header, ai_metadata), "Merged YAML"
+    if yaml_header and opt2:
+        return ai_metadata, "Replaced YAML"  # Completely replace existing YAML
+    return ai_metadata, "Added YAML"  # Default case: use AI-generated YAML only
+
+
+def skip_reason(yaml_header, opt1, opt2):
+    """
+    Decide from the YAML header alone whether a file can be skipped.
+
+    Without `opt1`/`opt2`, notes with no header are left alone, as are notes that
+    already have both `tags` and `category`.
+
+    Returns:
+        - str: The log action for a skipped file, or None if it should be processed.
+    """
+    if opt1 or opt2:
+        return None
+    if not yaml_header:
+        return "Skipped (No YAML Header)"
+    if isinstance(yaml_header, dict) and yaml_header.get("tags") and yaml_header.get("category"):
+        return "Skipped (Already Tagged)"
+    return None
+
+
+def record_header(file_path, metadata, content_hash=None, index=None, header_cache=None):
+    """
+    Remember a note's current frontmatter in the vault index and header cache, if enabled.
+
+    Failures here never stop a run; they only cost a reparse next time.
+    """
+    if header_cache is not None:
+        try:
+            header_cache.put(file_path, os.stat(file_path), metadata)
+        except OSError:
+            pass
+    if index is not None:
+        try:
+            update_note(index, file_path, metadata, content_hash)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error indexing {file_path}: {e}")
+            logging.error(f"Error indexing {file_path}: {e}")
+
+
+def refresh_index(note, content, content_hash, index):
+    """
+    Index a note that is skipped as unchanged if the index has no current row for it,
+    so a new or deleted index file fills up again without reprocessing the vault.
+    """
+    try:
+        found, _ = indexed_metadata(index, note.path, note.stat())
+    except (sqlite3.Error, OSError):
+        found = False
+    if found:
+        return
+    try:
+        metadata, _ = extract_yaml_header(content)
+    except yaml.YAMLError:
+        return  # Reported when the note is next processed
+    record_header(note.path, metadata, content_hash, index)
+
+
+def probe_header(file_path, index=None, header_cache=None, stat=None):
+    """
+    Find a note's frontmatter as cheaply as possible: from the header cache or the
+    vault index if the note is unchanged since then, otherwise by reading only the header.
+
+    Parameters:
+        - stat (os.stat_result): The note's stat if already known, e.g. from discovery.
+
+    Returns:
+        - dict | None | False: The metadata, None if there is no header, or False if it could not be determined.
+    """
+    if stat is None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False  # Unknown: the caller falls back to a full read
+
+    if header_cache is not None:
+        found, metadata = header_cache.get(file_path, stat)
+        if found:
+            return metadata
+
+    if index is not None:
+        try:
+            found, metadata = indexed_metadata(index, file_path, stat)
+        except sqlite3.Error:
+            found = False
+        if found:
+            if header_cache is not None:
+                header_cache.put(file_path, stat, metadata)
+            return metadata
+
+    try:
+        metadata, _ = probe_yaml_header(file_path)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return False
+    record_header(file_path, metadata, index=index, header_cache=header_cache)
+    return metadata
+
+
+_DONE = object()
+
+
+def _finish(steps, ai_metadata):
+    """Send AI metadata to a `process_steps` generator and let it run to completion."""
+    try:
+        steps.send(ai_metadata)
+    except StopIteration:
+        pass
+
+
+def process_file(file_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+                 manifest=None, force=False, stats=None, probe=False, index=None, header_cache=None,
+                 durability="file", pending_dirs=None, writer=None, sidecar=None):
     """
     Process an individual Markdown file with different processing modes.
     
     Parameters:
-        - file_path (str): Path to the Markdown file.
+        - file_path (str | Note): Path to the Markdown file, or its `Note` from discovery.
         - reference_content (str): Reference content for generating tags.
         - prompt_template (str): Template for the AI prompt.
         - reference_tags (set): Existing tags from the reference content.
@@ -56,65 +197,377 @@ def process_file(file_path, reference_content, prompt_template, reference_tags,
         - test_mode (bool): Use predefined trial metadata instead of OpenAI.
         - log_file (str): Path to log file.
         - new_tags_log (str): Path to new tags log file.
+        - manifest (dict): Run manifest to consult and update (optional).
+        - force (bool): Reprocess the file even if the manifest says it is unchanged.
+        - stats (Counter): Run counters to update (optional).
+        - probe (bool): Read only the frontmatter first and skip without loading the body when possible.
+        - index (sqlite3.Connection): Vault metadata index to keep up to date (optional).
+        - header_cache (HeaderCache): Cache of parsed frontmatter used when probing (optional).
+        - durability (str): Flushing policy for the atomic note write ("file", "batch" or "none").
+        - pending_dirs (set): Directories to fsync at the end of the batch under the "batch" policy.
+        - writer (WriteBehind): Queue to hand the note write to instead of writing it here (optional);
+          the note is counted and recorded once the write has been applied.
+        - sidecar (file): Sidecar store (see `scripts.sidecar`) to record the new metadata in instead of
+          writing the note; apply it later with `apply_sidecar` (optional).
+    """
+    steps = process_steps(
+        file_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+        manifest=manifest, force=force, stats=stats, probe=probe, index=index, header_cache=header_cache,
+        durability=durability, pending_dirs=pending_dirs, writer=writer, sidecar=sidecar
+    )
+    body = next(steps, _DONE)
+    if body is _DONE:
+        return  # Skipped, unchanged or failed before classification
+    ai_metadata = generate_yaml_header(body, reference_content, prompt_template, test_mode)
+    _finish(steps, ai_metadata)
+
+
+def process_steps(file_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+                 manifest=None, force=False, stats=None, probe=False, index=None, header_cache=None,
+                 durability="file", pending_dirs=None, writer=None, sidecar=None):
     """
+    The steps of `process_file` as a generator, so classification can happen elsewhere.
+
+    The generator yields the note body once it needs AI metadata and expects the metadata
+    to be sent back; it finishes without yielding when the note is skipped. Parameters are
+    as for `process_file`.
+    """
+    if stats is None:
+        stats = Counter()
+    note = as_note(file_path)
+    file_path, file_name = note.path, note.name
+
+    if probe:
+        try:
+            stat = note.stat()
+        except OSError:
+            stat = None
+        probed_header = probe_header(file_path, index, header_cache, stat)
+        if probed_header is not False:
+            note.metadata = probed_header
+        reason = skip_reason(probed_header, opt1, opt2) if probed_header is not False else None
+        if reason:
+            log_action(log_file, reason, file_path)
+            stats["skipped"] += 1
+            return
+
     try:
         content = load_file_content(file_path)
+        note.set_content(content)
     except Exception as e:
         print(f"Error reading {file_path}: {e}")
+        stats["errors"] += 1
         return
 
+    content_hash = hash_text(content)
+    if manifest is not None:
+        version = config_version(reference_content, prompt_template)
+        mode = run_mode(opt1, opt2, test_mode)
+        if not force and is_unchanged(manifest, file_path, content_hash, version, mode):
+            log_action(log_file, "Skipped (Unchanged)", file_path)
+            stats["unchanged"] += 1
+            if index is not None:
+                refresh_index(note, content, content_hash, index)
+            return
+
     print("test 1")
     yaml_header, body = extract_yaml_header(content)
 
     # If yaml_header is a string, attempt to parse it as YAML
     if isinstance(yaml_header, str):
         try:
-            yaml_header = yaml.safe_load(yaml_header) or {}
+            yaml_header = yaml_codec.load(yaml_header) or {}
         except yaml.YAMLError as e:
             print(f"Error parsing YAML: {e}")
             logging.error(f"Error parsing YAML: {e}")
+            stats["errors"] += 1
             return
+    if yaml_header and not isinstance(yaml_header, dict):
+        # e.g. "---\njust a string\n---": not metadata that can be merged or replaced safely
+        print(f"Error: frontmatter of {file_path} is not a mapping; leaving the note unchanged.")
+        logging.error(f"Frontmatter of {file_path} is not a mapping")
+        stats["errors"] += 1
+        return
+    note.metadata, note.body = yaml_header, body
 
-    file_name = os.path.basename(file_path)  # Extract just the file name
-
-    # If no YAML header exists and neither option is used, skip the file
-    if not yaml_header and not (opt1 or opt2):
-        log_action(log_file, "Skipped (No YAML Header)", file_name)
+    # If neither option is used, skip files with no YAML header or with tags and category already set
+    reason = skip_reason(yaml_header, opt1, opt2)
+    if reason:
+        log_action(log_file, reason, file_name)
+        stats["skipped"] += 1
+        record_header(file_path, yaml_header, content_hash, index, header_cache)
+        if manifest is not None:
+            record_result(manifest, file_path, content_hash, yaml_header, version, mode, reason)
         return
     print("test 2")
-# Generate new YAML metadata using AI or trial mode
-    ai_metadata = generate_yaml_header(body, reference_content, prompt_template, test_mode)
+# Generate new YAML metadata using AI or trial mode (by whoever drives these steps)
+    ai_metadata = yield body
+    if not ai_metadata:
+        stats["empty_generations"] += 1  # Failed or empty reply: the note is left for a later run
 
-    if yaml_header and opt1:
-        merged_metadata = merge_yaml_headers(yaml_header, ai_metadata)
-        print(f"Merging YAML for {file_name}")  # Debugging line
-
-        log_action(log_file, "Merged YAML", file_name)
-
-        
-    elif yaml_header and opt2:
-        merged_metadata = ai_metadata  # Completely replace existing YAML
-        print(f"Replacing YAML for {file_name}")  # Debugging line
-        log_action(log_file, "Replaced YAML", file_name)  # Ensure this line gets hit
-    else:
-        merged_metadata = ai_metadata  # Default case: use AI-generated YAML only
-        print(f"Added YAML for {file_name}")  # Debugging line
-        log_action(log_file, "Added YAML", file_name)  # Ensure this line gets hit
+    merged_metadata, action = combine_metadata(yaml_header, ai_metadata, opt1, opt2)
+    print(f"{action} for {file_name}")  # Debugging line
+    log_action(log_file, action, file_name)
 
     # Identify and log new tags
     new_tags = identify_new_tags(merged_metadata.get("tags", []), reference_tags)
     if new_tags:
         log_new_tags(file_name, new_tags, new_tags_log)
     print("test 3")
-    # Write updated file
-    try:
-        write_updated_file(file_path, merged_metadata, body)
-    except Exception as e:
+    def record_outcome(new_content):
+        stats["processed"] += 1
+        if isinstance(new_content, str):
+            record_header(file_path, merged_metadata, hash_text(new_content.strip()), index, header_cache)
+        if manifest is not None and ai_metadata and isinstance(new_content, str):
+            # Record the hash of what is now on disk so the next run sees it as unchanged.
+            # Failed generations ({}) are not recorded, so they are retried next run.
+            record_result(manifest, file_path, hash_text(new_content.strip()), merged_metadata, version, mode, action)
+
+    def record_written(new_header):
+        stats["written"] += 1
+        note.written(merged_metadata)
+        record_outcome(rewritten_content(content, new_header) if isinstance(new_header, str) else None)
+
+    def record_write_error(e):
         print(f"Error writing {file_path}: {e}")
-        return
+        logging.error(f"Error writing {file_path}: {e}")
+        stats["errors"] += 1
+
+    # Write updated file, unless the header would come out semantically the same
+    if same_metadata(yaml_header, merged_metadata):
+        log_action(log_file, "Unchanged YAML (not written)", file_name)
+        stats["unchanged_yaml"] += 1
+        note.metadata = merged_metadata
+        record_outcome(content)
+    elif sidecar is not None:
+        append_entry(sidecar, file_path, content_hash, merged_metadata, action)
+        stats["processed"] += 1
+        stats["sidecar"] += 1
+        record_header(file_path, yaml_header, content_hash, index, header_cache)  # The note itself is unchanged
+        if manifest is not None and ai_metadata:
+            record_result(manifest, file_path, content_hash, merged_metadata, version, mode, action)
+    elif writer is not None:
+        writer.submit(
+            file_path,
+            lambda: write_updated_file(file_path, merged_metadata, body, durability=durability, pending_dirs=pending_dirs),
+            on_done=record_written, on_error=record_write_error,
+        )
+    else:
+        try:
+            new_header = write_updated_file(file_path, merged_metadata, body, durability=durability, pending_dirs=pending_dirs)
+        except Exception as e:
+            record_write_error(e)
+            return
+        record_written(new_header)
+
+
+def _llm_counters():
+    """Counters kept by the shared OpenAI rate limiter and response cache (see `scripts.tagging`)."""
+    limiter, cache = tagging.RATE_LIMITER, tagging.RESPONSE_CACHE
+    counters = Counter(rate_limit_waits=limiter.waits, rate_limited=limiter.throttled, llm_retries=limiter.retried)
+    if cache is not None:
+        counters.update(response_cache_hits=cache.hits, response_cache_misses=cache.misses)
+    return counters
+
+
+def _pending(file_paths, start_steps):
+    """
+    Start `process_steps` for each note, yielding the notes that need AI metadata.
+
+    Skipped notes are finished (and their bodies released) as they are reached.
+
+    Yields:
+        - tuple: ((note, steps), body) for each note awaiting metadata.
+    """
+    for file_path in file_paths:
+        note = as_note(file_path)
+        steps = start_steps(note)
+        body = next(steps, _DONE)
+        if body is _DONE:
+            note.release_body()
+            continue
+        yield (note, steps), body
+
+
+async def _process_concurrently(file_paths, start_steps, tagger, pack=False):
+    """
+    Drive `process_steps` for every note, classifying several note bodies at once.
 
+    Notes are read and skipped lazily as the request window has room, and each note is
+    finished (merged, written, logged) in input order as soon as its metadata arrives.
 
-def process_folder(folder_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log):
+    Parameters:
+        - file_paths (iterable): Paths or `Note`s to process.
+        - start_steps (callable): Returns the `process_steps` generator for a `Note`.
+        - tagger (AsyncTagger): Generates the AI metadata.
+        - pack (bool): Send short notes several to a request (see `pack_notes`).
+    """
+    jobs = _pending(file_paths, start_steps)
+    if pack:
+        jobs = (([key for key, _ in group], [body for _, body in group]) for group in pack_notes(jobs))
+        generate = tagger.generate_many
+    else:
+        jobs = (([key], body) for key, body in jobs)
+        generate = tagger.generate
+
+    try:
+        async for keys, results in generate_in_order(jobs, generate, tagger.concurrency):
+            for (note, steps), ai_metadata in zip(keys, results if pack else [results]):
+                _finish(steps, ai_metadata)
+                note.release_body()  # Callers holding on to notes keep only their metadata
+    finally:
+        await tagger.close()
+
+
+def process_paths(file_paths, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+                  manifest_file=None, force=False, probe=False, index_file=None, header_cache_file=None,
+                  durability="batch", write_behind=False, sidecar_file=None, concurrency=1, batch_export_file=None,
+                  batch_results=None, pack=False, prune_index=False):
+    """
+    Process an explicit sequence of Markdown files, sharing one manifest and set of run counters.
+
+    Parameters:
+        - file_paths (iterable): Paths or `Note`s to process; may be a generator.
+        - manifest_file (str): Path to the run manifest; None disables change tracking.
+        - force (bool): Reprocess every file regardless of the manifest.
+        - probe (bool): Decide skips from the frontmatter alone before reading whole notes.
+        - index_file (str): Path to the SQLite vault index; None disables indexing.
+        - header_cache_file (str): Path to the parsed frontmatter cache used with `probe`; None disables it.
+        - durability (str): "file" fsyncs every note, "batch" fsyncs each touched directory once at the
+          end of the run, "none" never fsyncs. Writes are atomic under every policy.
+        - write_behind (bool): Apply note writes on a background writer thread (see `WriteBehind`).
+        - sidecar_file (str): Append new metadata to this sidecar store instead of rewriting notes; None writes notes.
+        - concurrency (int): OpenAI requests kept in flight at once (see `AsyncTagger`); 1 classifies notes one by one.
+        - batch_export_file (str): Instead of classifying notes, write the request of every note that needs
+          one to this Batch API input file (see `scripts.batch`).
+        - batch_results (dict): Metadata from `load_batch_results` to apply instead of calling OpenAI; notes
+          without a result are left as they are.
+        - pack (bool): Classify short notes several to a request, so they share one copy of the reference and
+          prompt (see `tagging.pack_notes`); replies that cannot be split fall back to one request per note.
+        - prune_index (bool): Once every note has been processed, drop index rows for notes that no longer
+          exist (deleted or renamed); set when `file_paths` covers the whole folder.
+        - Remaining parameters are as for `process_file`.
+
+    Returns:
+        - Counter: Run counters (processed, written, unchanged_yaml, skipped, unchanged, errors, llm_errors, empty_generations,
+          header cache hits/misses, rate_limit_waits, rate_limited, response cache hits/misses, batch_*,
+          packed_requests, pack_fallbacks, index_pruned).
+    """
+    stats = Counter()
+    manifest = load_manifest(manifest_file) if manifest_file else None
+    index = open_index(index_file) if index_file else None
+    header_cache = HeaderCache(header_cache_file) if header_cache_file and probe else None
+    pending_dirs = set()
+    writer = WriteBehind() if write_behind else None
+    sidecar = open_sidecar(sidecar_file) if sidecar_file else None
+    batch_file = open(batch_export_file, "w", encoding="utf-8") if batch_export_file else None
+    llm_counters = _llm_counters()
+
+    def start_steps(note):
+        return process_steps(
+            note, reference_content, prompt_template,
+            reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+            manifest=manifest, force=force, stats=stats, probe=probe, index=index, header_cache=header_cache,
+            durability=durability, pending_dirs=pending_dirs, writer=writer, sidecar=sidecar
+        )
+
+    try:
+        if batch_file is not None:
+            exported = set()
+            for (note, steps), body in _pending(file_paths, start_steps):
+                steps.close()  # Finished when the results are ingested
+                request = batch_request(body, reference_content, prompt_template)
+                if request["custom_id"] in exported:
+                    stats["batch_duplicates"] += 1  # Same prompt: one result serves both notes
+                else:
+                    exported.add(request["custom_id"])
+                    write_request(batch_file, request)
+                    stats["batch_requests"] += 1
+                note.release_body()
+        elif batch_results is not None:
+            for (note, steps), body in _pending(file_paths, start_steps):
+                custom_id = batch_custom_id(body, reference_content, prompt_template)
+                if batch_results.get(custom_id) is None:
+                    steps.close()
+                    stats["batch_failed" if custom_id in batch_results else "batch_missing"] += 1
+                else:
+                    _finish(steps, batch_results[custom_id])
+                    stats["batch_applied"] += 1
+                note.release_body()
+        elif concurrency > 1:
+            tagger = AsyncTagger(reference_content, prompt_template, test_mode=test_mode, concurrency=concurrency)
+            try:
+                asyncio.run(_process_concurrently(file_paths, start_steps, tagger, pack=pack))
+            finally:
+                for counter in ("packed_requests", "pack_fallbacks"):
+                    if getattr(tagger, counter):
+                        stats[counter] += getattr(tagger, counter)
+                if tagger.errors:
+                    stats["llm_errors"] += tagger.errors
+        elif pack:
+            for group in pack_notes(_pending(file_paths, start_steps)):
+                bodies = [body for _, body in group]
+                results = None
+                if len(group) > 1:
+                    stats["packed_requests"] += 1
+                    results = generate_packed_headers(bodies, reference_content, prompt_template, test_mode)
+                    if results is None:
+                        stats["pack_fallbacks"] += 1
+                if results is None:
+                    results = [generate_yaml_header(body, reference_content, prompt_template, test_mode) for body in bodies]
+                for ((note, steps), _), ai_metadata in zip(group, results):
+                    _finish(steps, ai_metadata)
+                    note.release_body()
+        else:
+            for file_path in file_paths:
+                note = as_note(file_path)
+                process_file(
+                    note, reference_content, prompt_template,
+                    reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+                    manifest=manifest, force=force, stats=stats, probe=probe, index=index, header_cache=header_cache,
+                    durability=durability, pending_dirs=pending_dirs, writer=writer, sidecar=sidecar
+                )
+                note.release_body()  # Callers holding on to notes keep only their metadata
+
+        if index is not None and prune_index:
+            # Only after a complete pass: an interrupted run must not drop rows for notes it never reached
+            try:
+                pruned = prune_missing(index)
+            except sqlite3.Error as e:
+                print(f"Error pruning the vault index: {e}")
+                logging.error(f"Error pruning the vault index: {e}")
+            else:
+                if pruned:
+                    stats["index_pruned"] += pruned
+    finally:
+        # Save progress even if the run is interrupted part-way
+        if writer is not None:
+            writer.close()  # Applies queued writes and records them before the manifest is saved
+            if writer.coalesced:
+                stats["coalesced_writes"] += writer.coalesced
+        fsync_dirs(pending_dirs)
+        if sidecar is not None:
+            sidecar.close()
+        if batch_file is not None:
+            batch_file.close()
+        if manifest is not None:
+            save_manifest(manifest_file, manifest)
+        if index is not None:
+            index.close()
+        if header_cache is not None:
+            header_cache.save()
+            stats["header_cache_hits"] += header_cache.hits
+            stats["header_cache_misses"] += header_cache.misses
+        stats.update(_llm_counters() - llm_counters)  # Only what this run added
+
+    return stats
+
+
+def process_folder(folder_path, reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+                   manifest_file=None, force=False, probe=False,
+                   include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS, workers=1, shard=None, index_file=None,
+                   header_cache_file=None, order=(), durability="batch", write_behind=False, output_root=None,
+                   sidecar_file=None, concurrency=1, batch_export_file=None, batch_results=None, pack=False):
     """
     Iterate through Markdown files in the folder and process them.
     
@@ -128,11 +581,46 @@ def process_folder(folder_path, reference_content, prompt_template, reference_ta
         - test_mode (bool): Use predefined trial metadata instead of OpenAI.
         - log_file (str): Path to log file.
         - new_tags_log (str): Path to new tags log file.
+        - manifest_file (str): Path to the run manifest; None disables change tracking.
+        - force (bool): Reprocess every file regardless of the manifest.
+        - probe (bool): Decide skips from the frontmatter alone before reading whole notes.
+        - include (tuple): Glob patterns for notes to process.
+        - exclude (tuple): Glob patterns for notes and folders to ignore.
+        - prune_dirs (tuple): Folder names that are never descended into.
+        - workers (int): Threads used to list directories.
+        - shard (tuple): (k, n) to only process the k-th of n shards of the folder.
+        - index_file (str): Path to the SQLite vault index; None disables indexing.
+        - header_cache_file (str): Path to the parsed frontmatter cache; None disables it.
+        - order (tuple): Scheduling policies (see `scripts.scheduler.POLICIES`); empty keeps discovery order.
+        - durability (str): When to fsync written notes, as for `process_paths`.
+        - write_behind (bool): Write notes from a background thread, as for `process_paths`.
+        - output_root (str): Leave `folder_path` untouched and process a hardlinked mirror of it in this
+          folder instead (see `scripts.mirror.mirror_tree`); None processes the notes in place.
+        - sidecar_file (str): Record new metadata in this sidecar store instead of rewriting notes.
+        - concurrency (int): OpenAI requests kept in flight at once, as for `process_paths`.
+        - batch_export_file (str): Export Batch API requests instead of classifying, as for `process_paths`.
+        - batch_results (dict): Apply results from the Batch API, as for `process_paths`.
+        - pack (bool): Send short notes several to a request, as for `process_paths`.
+
+    Returns:
+        - Counter: Run counters (processed, written, unchanged_yaml, skipped, unchanged, errors, mirror_*).
     """
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.endswith(".md"):
-                process_file(
-                    os.path.join(root, file), reference_content, prompt_template, 
-                    reference_tags, opt1, opt2, test_mode, log_file, new_tags_log
-                )
+    mirror_stats = Counter()
+    if output_root:
+        mirror_stats = mirror_tree(folder_path, output_root)
+        folder_path = output_root
+
+    notes = (Note.from_entry(entry) for entry in iter_notes(folder_path, include, exclude, prune_dirs, workers)
+             if in_shard(entry.path, folder_path, shard))
+    if order:
+        notes = schedule(notes, order)  # Needs the whole work queue up front
+
+    stats = process_paths(
+        notes,
+        reference_content, prompt_template, reference_tags, opt1, opt2, test_mode, log_file, new_tags_log,
+        manifest_file=manifest_file, force=force, probe=probe, index_file=index_file,
+        header_cache_file=header_cache_file, durability=durability, write_behind=write_behind,
+        sidecar_file=sidecar_file, concurrency=concurrency, batch_export_file=batch_export_file,
+        batch_results=batch_results, pack=pack, prune_index=True
+    )
+    return stats + mirror_stats
@@ -0,0 +1,179 @@
+import re
+import time
+import asyncio
+import threading
+
+CHARS_PER_TOKEN = 4  # Rough size of an English token; good enough to budget requests
+COMPLETION_TOKENS = 256  # Expected reply size: a short YAML header
+THROTTLED_WAIT = 1.0  # Seconds to back off after a 429 that says nothing about when to retry
+ERROR_BACKOFF = 0.5  # Seconds to back off after the first server or connection error, doubled on each retry
+MAX_ERROR_BACKOFF = 8.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def estimate_tokens(prompt, completion_tokens=COMPLETION_TOKENS):
+    """
+    Estimate the tokens a request will count against the tokens-per-minute quota.
+
+    Parameters:
+        - prompt (str): All message text sent with the request.
+        - completion_tokens (int): Tokens expected in the reply.
+
+    Returns:
+        - int: Estimated prompt plus completion tokens.
+    """
+    return len(prompt) // CHARS_PER_TOKEN + completion_tokens
+
+
+def parse_duration(value):
+    """
+    Parse a rate-limit reset or retry header ("20ms", "1.5s", "6m0s", or plain seconds).
+
+    Returns:
+        - float: Seconds, or None if the value cannot be parsed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class _Bucket:
+    """A token bucket holding up to one minute of quota, refilled continuously."""
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute, now):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = now
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount, now):
+        """Debit `amount` and return how long the caller must wait until it is covered."""
+        self.refill(now)
+        self.level -= amount
+        return -self.level / self.rate if self.level < 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by every thread and task of a run.
+
+    Callers reserve quota before each request and sleep for the wait they are given, so
+    concurrent callers queue up behind each other instead of all firing and being throttled
+    together. The buckets are resynced from the `x-ratelimit-*` and `Retry-After` headers
+    of every response, and limits the server reports are adopted when none (or a higher
+    one) was configured. A limit of 0 is unlimited until the server reports one.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        now = clock()
+        self._requests = _Bucket(requests_per_minute, now) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute, now) if tokens_per_minute else None
+        self._blocked_until = now
+        self.waits = 0  # Requests that had to wait for quota
+        self.throttled = 0  # 429 responses seen
+        self.retried = 0  # Server and connection errors backed off from
+
+    def reserve(self, tokens):
+        """
+        Reserve quota for one request of about `tokens` tokens.
+
+        Returns:
+            - float: Seconds the caller must wait before sending the request.
+        """
+        with self._lock:
+            now = self._clock()
+            wait = max(0.0, self._blocked_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.take(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.take(tokens, now))
+            if wait:
+                self.waits += 1
+            return wait
+
+    def acquire(self, tokens):
+        """Block the calling thread until a request of about `tokens` tokens may be sent."""
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens):
+        """Wait, without blocking the event loop, until a request of about `tokens` tokens may be sent."""
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def record(self, headers, estimated_tokens=0, used_tokens=None):
+        """
+        Resync the buckets after a response.
+
+        Parameters:
+            - headers (Mapping): Response headers.
+            - estimated_tokens (int): Tokens reserved for the request.
+            - used_tokens (int): Tokens the response reports it used, to refund or charge the difference.
+        """
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        with self._lock:
+            now = self._clock()
+            self._requests = self._resync(self._requests, headers, "requests", now)
+            self._tokens = self._resync(self._tokens, headers, "tokens", now)
+            if used_tokens is not None and self._tokens is not None:
+                self._tokens.level += estimated_tokens - used_tokens
+            retry_after = parse_duration(headers.get("retry-after-ms"))
+            retry_after = retry_after / 1000 if retry_after is not None else parse_duration(headers.get("retry-after"))
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def record_throttled(self, headers):
+        """Resync after a 429 and hold every caller back until the quota has reset."""
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        self.record(headers)
+        with self._lock:
+            self.throttled += 1
+            now = self._clock()
+            if self._blocked_until <= now:
+                # No Retry-After: wait for whichever exhausted quota resets, or back off briefly
+                resets = [parse_duration(headers.get(f"x-ratelimit-reset-{kind}")) for kind in ("requests", "tokens")
+                          if headers.get(f"x-ratelimit-remaining-{kind}") in ("0", 0)]
+                self._blocked_until = now + max([reset for reset in resets if reset] or [THROTTLED_WAIT])
+
+    def back_off(self, attempt):
+        """Hold every caller back after a server (5xx) or connection error, longer on each `attempt` (from 0)."""
+        with self._lock:
+            self.retried += 1
+            now = self._clock()
+            self._blocked_until = max(self._blocked_until, now + min(MAX_ERROR_BACKOFF, ERROR_BACKOFF * 2 ** attempt))
+
+    @staticmethod
+    def _resync(bucket, headers, kind, now):
+        limit = headers.get(f"x-ratelimit-limit-{kind}")
+        if limit is not None and limit.isdigit() and int(limit):
+            limit = int(limit)
+            if bucket is None:
+                bucket = _Bucket(limit, now)
+            elif limit < bucket.capacity:
+                bucket.capacity, bucket.rate = limit, limit / 60
+        remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+        if bucket is not None and remaining is not None and remaining.isdigit():
+            # The server has seen every request so far; never assume more quota than it reports
+            bucket.refill(now)
+            bucket.level = min(bucket.level, int(remaining))
+        return bucket
@@ -0,0 +1,112 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 3600  # Seconds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+"""
+
+
+def response_key(model, messages):
+    """
+    Key a request by everything that determines the reply: the model and the fully rendered messages.
+
+    Parameters:
+        - model (str): Model name.
+        - messages (list): Chat messages, including the system prompt.
+
+    Returns:
+        - str: SHA-256 hex digest.
+    """
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite cache of LLM replies, keyed by `response_key`.
+
+    Entries expire `ttl` seconds after they were stored, and the least recently used
+    entries are evicted once the stored replies exceed `max_bytes`. Safe to share between
+    the threads of a run; `hits` and `misses` count lookups since it was opened.
+    """
+
+    def __init__(self, cache_file, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, clock=time.time):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_file, timeout=30, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (clock() - ttl,))
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """
+        Look up a cached reply.
+
+        Returns:
+            - str: The reply text, or None on a miss (including an expired entry).
+        """
+        with self._lock:
+            now = self._clock()
+            row = self._conn.execute("SELECT response, size, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or row[2] < now - self.ttl:
+                if row is not None:
+                    self._delete(key, row[1])
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """Store a reply, evicting the least recently used replies beyond the size cap."""
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            now = self._clock()
+            with self._conn:
+                row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, response, size, now, now),
+                )
+            self._total += size - (row[0] if row else 0)
+            self._evict()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _delete(self, key, size):
+        with self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._total -= size
+
+    def _evict(self):
+        while self._total > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if self._total <= self.max_bytes:
+                    break
+                self._delete(key, size)
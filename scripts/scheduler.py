@@ -0,0 +1,65 @@
+from scripts.file_utils import _read_header
+
+# Notes above this size are treated as "large" by the largest-last policy
+LARGE_NOTE_BYTES = 32 * 1024
+
+
+def has_frontmatter(file_path):
+    """Check whether a note has frontmatter (by the same rules as `find_frontmatter`), reading only its header."""
+    try:
+        with open(file_path, "rb") as f:
+            header, _ = _read_header(f)
+    except OSError:
+        return False
+    return header is not None
+
+
+# Each policy maps a Note (or DirEntry) to a sort key; lower keys are processed first
+POLICIES = {
+    "missing-yaml": lambda entry: 0 if not has_frontmatter(entry.path) else 1,
+    "recent": lambda entry: -entry.stat().st_mtime_ns,
+    "shortest": lambda entry: entry.stat().st_size,
+    "largest-last": lambda entry: 1 if entry.stat().st_size > LARGE_NOTE_BYTES else 0,
+}
+
+
+def parse_order(value):
+    """
+    Parse a comma-separated list of scheduling policies, e.g. `missing-yaml,recent`.
+
+    Returns:
+        - tuple: Policy names, in priority order.
+    """
+    order = tuple(name.strip() for name in value.split(",") if name.strip())
+    unknown = [name for name in order if name not in POLICIES]
+    if unknown:
+        raise ValueError(f"Unknown scheduling policy: {', '.join(unknown)} (choose from {', '.join(POLICIES)})")
+    return order
+
+
+def schedule(entries, order):
+    """
+    Order notes so the most valuable ones are processed first.
+
+    Policies are applied lexicographically: the first policy decides, later ones
+    break ties, and discovery order is kept for notes that are still tied.
+
+    Parameters:
+        - entries (iterable): `Note`s (or `os.DirEntry` objects) from discovery.
+        - order (tuple): Policy names from `POLICIES`.
+
+    Returns:
+        - list: The entries in processing order.
+    """
+    entries = list(entries)
+    if not order:
+        return entries
+    keys = [POLICIES[name] for name in order]
+
+    def sort_key(entry):
+        try:
+            return tuple(key(entry) for key in keys)
+        except OSError:
+            return tuple(float("inf") for _ in keys)  # Vanished notes go last; process_file reports them
+
+    return sorted(entries, key=sort_key)
@@ -0,0 +1,115 @@
+import os
+import json
+import yaml
+from collections import Counter
+from scripts.file_utils import load_file_content, extract_yaml_header, write_updated_file, rewritten_content, fsync_dirs
+from scripts.manifest import hash_text, manifest_key, same_metadata, load_manifest, save_manifest
+from scripts import yaml_codec
+
+
+def open_sidecar(sidecar_file):
+    """Open the sidecar store for appending; entries from earlier runs are kept."""
+    return open(sidecar_file, "a", encoding="utf-8")
+
+
+def append_entry(sidecar, file_path, content_hash, metadata, action):
+    """
+    Record the metadata a note would get, instead of writing it into the note.
+
+    Parameters:
+        - sidecar (file): Store opened with `open_sidecar`.
+        - file_path (str): The note.
+        - content_hash (str): Hash of the note content the metadata was generated for.
+        - metadata (dict): The merged frontmatter.
+        - action (str): What the merge did, e.g. "Merged YAML".
+    """
+    # The header is kept as YAML text, so dates and other YAML types survive the JSON line unchanged
+    entry = {"path": manifest_key(file_path), "content_hash": content_hash, "action": action,
+             "metadata_yaml": yaml_codec.dump(metadata)}
+    sidecar.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def load_sidecar(sidecar_file):
+    """
+    Read the sidecar store; later entries for a note replace earlier ones.
+
+    Returns:
+        - dict: Entries keyed by note path, in the order notes first appear, with the header
+          parsed back into `entry["metadata"]`.
+    """
+    entries = {}
+    if not os.path.exists(sidecar_file):
+        return entries
+    with open(sidecar_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # A line cut off by an interrupted run
+            if not isinstance(entry, dict) or "path" not in entry:
+                continue
+            if "metadata_yaml" in entry:
+                try:
+                    entry["metadata"] = yaml_codec.load(entry.pop("metadata_yaml"))
+                except yaml.YAMLError:
+                    continue
+            if "metadata" in entry:
+                entries[entry["path"]] = entry
+    return entries
+
+
+def apply_sidecar(sidecar_file, durability="batch", manifest_file=None):
+    """
+    Write the metadata held in a sidecar store into the notes' frontmatter.
+
+    A note is only updated if it still has the content the metadata was generated for;
+    notes edited since are reported as stale and left alone.
+
+    Parameters:
+        - sidecar_file (str): The sidecar store.
+        - durability (str): Flushing policy for the note writes (see `file_utils.atomic_output`).
+        - manifest_file (str): Run manifest to move along to the applied content, so the next
+          run does not regenerate metadata for notes that only changed by being applied.
+
+    Returns:
+        - Counter: applied, already_applied, stale, missing and errors counts.
+    """
+    stats = Counter()
+    manifest = load_manifest(manifest_file) if manifest_file else None
+    pending_dirs = set()
+    try:
+        for path, entry in load_sidecar(sidecar_file).items():
+            try:
+                content = load_file_content(path)
+                yaml_header, body = extract_yaml_header(content)
+            except FileNotFoundError:
+                stats["missing"] += 1
+                continue
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                stats["errors"] += 1
+                continue
+
+            if same_metadata(yaml_header, entry["metadata"]):
+                stats["already_applied"] += 1
+                continue
+            if hash_text(content) != entry["content_hash"]:
+                stats["stale"] += 1
+                continue
+
+            try:
+                header = write_updated_file(path, entry["metadata"], body, durability=durability, pending_dirs=pending_dirs)
+            except Exception as e:
+                print(f"Error writing {path}: {e}")
+                stats["errors"] += 1
+                continue
+            stats["applied"] += 1
+
+            manifest_entry = manifest.get(path) if manifest is not None else None
+            if manifest_entry and manifest_entry.get("content_hash") == entry["content_hash"]:
+                manifest_entry["content_hash"] = hash_text(rewritten_content(content, header))
+    finally:
+        fsync_dirs(pending_dirs)
+        if manifest is not None:
+            save_manifest(manifest_file, manifest)
+    return stats
@@ -1,11 +1,82 @@
 import openai
 import yaml
 import os
+import re
 from scripts.file_utils import extract_yaml_header
+from scripts.rate_limit import RateLimiter, estimate_tokens, COMPLETION_TOKENS
+from scripts.response_cache import ResponseCache, response_key, DEFAULT_MAX_BYTES, DEFAULT_TTL
+from scripts import yaml_codec
 
 # Load OpenAI API key from environment variable
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+DEFAULT_MODEL = "gpt-4-turbo"
+SYSTEM_PROMPT = "You categorize notes using a provided reference."
+RATE_LIMIT_RETRIES = 3  # Times a throttled (429) or failed (5xx, connection) request is re-sent once the limiter allows it
+# Errors worth sending the same request again for; the SDK's own retries are off so these go through the limiter
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.InternalServerError)
+
+# Packed requests: short notes share one copy of the reference and prompt (see `pack_notes`)
+PACK_TOKEN_BUDGET = 2000  # Estimated tokens of note text per packed request
+PACK_MAX_NOTES = 8  # Keeps each reply well within the completion limit
+PACKED_NOTE_MAX_TOKENS = 500  # Longer notes are always sent on their own
+PACKED_INSTRUCTIONS = """
+
+The target note above is actually {count} separate notes, each starting with a line `=== note <id> ===`.
+Categorize each note on its own. Reply with exactly one YAML document per note, in the same order,
+each starting with `---` and including an `id` field with the note's id. Do not use code fences."""
+_CODE_FENCE = re.compile(r"^\s*```[\w-]*\s*$", re.MULTILINE)
+
+# Shared by every thread and async task that calls OpenAI; see `configure_rate_limits`
+RATE_LIMITER = RateLimiter()
+# Replies reused for identical prompts; None (the default) always asks OpenAI. See `configure_response_cache`
+RESPONSE_CACHE = None
+_client = None
+
+
+def configure_rate_limits(requests_per_minute=0, tokens_per_minute=0):
+    """
+    Replace the shared rate limiter with one for the account's quota.
+
+    Parameters:
+        - requests_per_minute (int): Requests allowed per minute; 0 learns the limit from response headers.
+        - tokens_per_minute (int): Prompt plus completion tokens allowed per minute; 0 likewise.
+
+    Returns:
+        - RateLimiter: The new shared limiter.
+    """
+    global RATE_LIMITER
+    RATE_LIMITER = RateLimiter(requests_per_minute, tokens_per_minute)
+    return RATE_LIMITER
+
+
+def build_messages(prompt):
+    """Return the chat messages for a rendered prompt."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def configure_response_cache(cache_file, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+    """
+    Cache OpenAI replies in `cache_file` for the rest of the run, or stop caching when it is None.
+
+    Parameters:
+        - cache_file (str): Path to the SQLite response cache; None disables caching.
+        - max_bytes (int): Total size of cached replies before the least recently used are evicted.
+        - ttl (float): Seconds a reply stays valid.
+
+    Returns:
+        - ResponseCache: The new shared cache, or None.
+    """
+    global RESPONSE_CACHE
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.close()
+    RESPONSE_CACHE = ResponseCache(cache_file, max_bytes, ttl) if cache_file else None
+    return RESPONSE_CACHE
+
+
 def extract_reference_tags(reference_content):
     """
     Extracts tags from the reference file.
@@ -42,6 +113,79 @@ def generate_yaml_header(content, reference_content, prompt_template, test_mode)
             "filename": "neural_network_model.py"
         }
 
+    prompt = build_prompt(content, reference_content, prompt_template)
+    messages = build_messages(prompt)
+    cache = RESPONSE_CACHE
+    key = response_key(DEFAULT_MODEL, messages) if cache is not None else None
+
+    try:
+        reply = cache.get(key) if cache is not None else None
+        if reply is not None:
+            return parse_metadata(reply)
+
+        response = _create_completion(messages, estimate_tokens(SYSTEM_PROMPT + prompt))
+        reply = response.choices[0].message.content
+        metadata = parse_metadata(reply)
+        if cache is not None:
+            cache.put(key, reply)  # Only replies that parse, so a bad one is asked for again next run
+        return metadata
+
+    except openai.OpenAIError as e:
+        print(f"🚨 OpenAI API Error: {e}")
+        return {}
+
+    except yaml.YAMLError as e:
+        print(f"⚠️ YAML Parsing Error: {e}")
+        return {}
+
+    except Exception as e:
+        print(f"❌ Unexpected Error in `generate_yaml_header`: {e}")
+        return {}
+
+
+def _create_completion(messages, estimated_tokens):
+    """
+    Send one chat completion request through the shared rate limiter.
+
+    Throttled requests are re-sent up to `RATE_LIMIT_RETRIES` times once the limiter,
+    resynced from the 429 response, allows it; server and connection errors likewise,
+    after the limiter's exponential backoff.
+    """
+    global _client
+    if _client is None:
+        _client = openai.OpenAI(max_retries=0)  # Throttling and transient errors are retried here, through the limiter
+    limiter = RATE_LIMITER
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire(estimated_tokens)
+        try:
+            raw = _client.chat.completions.with_raw_response.create(model=DEFAULT_MODEL, messages=messages)
+        except openai.RateLimitError as e:
+            limiter.record_throttled(e.response.headers)
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+            continue
+        except TRANSIENT_ERRORS:
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+            limiter.back_off(attempt)
+            continue
+        response = raw.parse()
+        limiter.record(raw.headers, estimated_tokens, response.usage.total_tokens if response.usage else None)
+        return response
+
+
+def build_prompt(content, reference_content, prompt_template):
+    """
+    Render the prompt for one note from the prompt template.
+
+    Parameters:
+        - content (str): The note body to categorize.
+        - reference_content (str): The reference note content.
+        - prompt_template (str): Template with `{reference}`, `{target_content}` and example placeholders.
+
+    Returns:
+        - str: The user message to send.
+    """
     # Prepare the prompt by replacing placeholders in the template
     tags = ["AI", "Machine Learning", "Deep Learning"]  # Example tags, replace with your logic
     category = "Technology"  # Example category, replace with your logic
@@ -49,7 +193,7 @@ def generate_yaml_header(content, reference_content, prompt_template, test_mode)
     topic = "Neural Networks"  # Example topic, replace with your logic
     filename = "neural_network_model.py"  # Example filename, replace with your logic
 
-    prompt = prompt_template.format(
+    return prompt_template.format(
         reference=reference_content,
         target_content=content,
         tag1=tags[0],  # Replace tag1 with the first tag in your list
@@ -61,38 +205,27 @@ def generate_yaml_header(content, reference_content, prompt_template, test_mode)
         filename=filename
     )
 
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You categorize notes using a provided reference."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        ai_metadata = yaml.safe_load(response["choices"][0]["message"]["content"].strip())
 
-        # Ensure missing fields get default values
-        return {
-            "tags": ai_metadata.get("tags", []),
-            "aliases": ai_metadata.get("aliases", []),
-            "category": ai_metadata.get("category", "Uncategorized"),
-            "phase": ai_metadata.get("phase", "Unknown"),
-            "topic": ai_metadata.get("topic", "General"),
-            "filename": ai_metadata.get("filename", "untitled.py")
-        }
+def parse_metadata(response_text):
+    """
+    Parse the YAML an LLM replied with, filling in defaults for missing fields.
 
-    except openai.error.OpenAIError as e:
-        print(f"🚨 OpenAI API Error: {e}")
-        return {}
+    Raises:
+        - yaml.YAMLError: If the reply is not valid YAML.
+    """
+    return _with_defaults(yaml_codec.load(response_text.strip()))
 
-    except yaml.YAMLError as e:
-        print(f"⚠️ YAML Parsing Error: {e}")
-        return {}
 
-    except Exception as e:
-        print(f"❌ Unexpected Error in `generate_yaml_header`: {e}")
-        return {}
+def _with_defaults(ai_metadata):
+    # Ensure missing fields get default values
+    return {
+        "tags": ai_metadata.get("tags", []),
+        "aliases": ai_metadata.get("aliases", []),
+        "category": ai_metadata.get("category", "Uncategorized"),
+        "phase": ai_metadata.get("phase", "Unknown"),
+        "topic": ai_metadata.get("topic", "General"),
+        "filename": ai_metadata.get("filename", "untitled.py")
+    }
 
 
 
@@ -111,3 +244,119 @@ def identify_new_tags(generated_tags, reference_tags):
         - set: Tags that are new compared to the reference.
     """
     return set(generated_tags) - reference_tags
+
+
+def pack_notes(items, budget=PACK_TOKEN_BUDGET, max_notes=PACK_MAX_NOTES):
+    """
+    Group notes into packs that can share one request.
+
+    Short notes are added to the current pack until it would exceed `budget` estimated
+    tokens or `max_notes` notes; notes longer than `PACKED_NOTE_MAX_TOKENS` get a pack
+    of their own (ending the current pack, so input order is kept across packs). Packs
+    are yielded as soon as they are full.
+
+    Parameters:
+        - items (iterable): (key, content) pairs; may be a lazy generator.
+        - budget (int): Estimated tokens of note text per pack.
+        - max_notes (int): Notes per pack.
+
+    Yields:
+        - list: (key, content) pairs for one request.
+    """
+    pack, pack_tokens = [], 0
+    for key, content in items:
+        tokens = estimate_tokens(content, completion_tokens=0)
+        if tokens > PACKED_NOTE_MAX_TOKENS:
+            if pack:
+                yield pack
+                pack, pack_tokens = [], 0
+            yield [(key, content)]
+            continue
+        if pack and (pack_tokens + tokens > budget or len(pack) >= max_notes):
+            yield pack
+            pack, pack_tokens = [], 0
+        pack.append((key, content))
+        pack_tokens += tokens
+    if pack:
+        yield pack
+
+
+def build_packed_prompt(contents, reference_content, prompt_template):
+    """
+    Render one prompt asking for the metadata of several notes, identified as note 1, 2, ...
+
+    Returns:
+        - str: The user message to send.
+    """
+    target_content = "\n\n".join(f"=== note {i} ===\n{content}" for i, content in enumerate(contents, 1))
+    return build_prompt(target_content, reference_content, prompt_template) + \
+        PACKED_INSTRUCTIONS.format(count=len(contents))
+
+
+def parse_packed_reply(response_text, count):
+    """
+    Split the reply to a packed prompt into per-note metadata.
+
+    Parameters:
+        - response_text (str): The reply: one YAML document per note, each with an `id`.
+        - count (int): Notes in the packed prompt.
+
+    Returns:
+        - list: Metadata for notes 1 to `count`, with defaults filled in.
+
+    Raises:
+        - yaml.YAMLError: If the reply is not valid YAML.
+        - ValueError: If the documents do not match the notes one to one.
+    """
+    documents = [doc for doc in yaml_codec.load_all(_CODE_FENCE.sub("", response_text)) if doc is not None]
+    by_id = {}
+    for doc in documents:
+        if not isinstance(doc, dict) or "id" not in doc:
+            raise ValueError("Packed reply contains a document without an id")
+        by_id[str(doc.pop("id")).strip()] = doc
+    expected = [str(i) for i in range(1, count + 1)]
+    if len(documents) != count or sorted(by_id) != sorted(expected):
+        raise ValueError(f"Packed reply has ids {sorted(by_id)}, expected {expected}")
+    return [_with_defaults(by_id[i]) for i in expected]
+
+
+def generate_packed_headers(contents, reference_content, prompt_template, test_mode):
+    """
+    Generate YAML headers for several notes with a single request.
+
+    Parameters:
+        - contents (list): Note bodies, e.g. a pack from `pack_notes`.
+        - reference_content (str): Reference content for generating tags.
+        - prompt_template (str): Template for the AI prompt.
+        - test_mode (bool): Return the predefined trial header for every note.
+
+    Returns:
+        - list: Metadata per note (`{}` for every note if the request failed), or None if the
+          reply could not be split into notes; send those notes one by one instead.
+    """
+    if test_mode:
+        return [generate_yaml_header(content, reference_content, prompt_template, True) for content in contents]
+
+    prompt = build_packed_prompt(contents, reference_content, prompt_template)
+    messages = build_messages(prompt)
+    cache = RESPONSE_CACHE
+    key = response_key(DEFAULT_MODEL, messages) if cache is not None else None
+
+    try:
+        reply = cache.get(key) if cache is not None else None
+        if reply is None:
+            estimated = estimate_tokens(SYSTEM_PROMPT + prompt, completion_tokens=COMPLETION_TOKENS * len(contents))
+            reply = _create_completion(messages, estimated).choices[0].message.content
+            results = parse_packed_reply(reply, len(contents))
+            if cache is not None:
+                cache.put(key, reply)
+            return results
+        return parse_packed_reply(reply, len(contents))
+
+    except openai.OpenAIError as e:
+        print(f"🚨 OpenAI API Error: {e}")
+        return [{} for _ in contents]
+
+    except (yaml.YAMLError, ValueError) as e:
+        print(f"⚠️ Could not split packed reply, sending notes one by one: {e}")
+        return None
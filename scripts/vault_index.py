@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    size INTEGER,
+    content_hash TEXT,
+    has_header INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS frontmatter (
+    path TEXT NOT NULL REFERENCES notes(path) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (path, key)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL REFERENCES notes(path) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (path, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_frontmatter_key ON frontmatter(key);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+"""
+
+
+def open_index(index_file):
+    """Open (and create if needed) the vault metadata index."""
+    conn = sqlite3.connect(index_file, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def index_key(file_path):
+    """Key index rows by absolute, normalised note path."""
+    return os.path.normpath(os.path.abspath(file_path))
+
+
+def update_note(conn, file_path, metadata, content_hash=None):
+    """
+    Replace the index rows for one note with its current stat and frontmatter.
+
+    Parameters:
+        - conn (sqlite3.Connection): Open index connection.
+        - file_path (str): Path to the note.
+        - metadata (dict): Parsed frontmatter, or None if the note has no header.
+        - content_hash (str): Hash of the note content, if known.
+    """
+    path = index_key(file_path)
+    try:
+        stat = os.stat(file_path)
+        mtime_ns, size = stat.st_mtime_ns, stat.st_size
+    except OSError:
+        mtime_ns = size = None
+
+    metadata = metadata if isinstance(metadata, dict) else {}
+    with conn:
+        conn.execute("DELETE FROM notes WHERE path = ?", (path,))
+        conn.execute(
+            "INSERT INTO notes (path, mtime_ns, size, content_hash, has_header, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, mtime_ns, size, content_hash, int(bool(metadata)), time.time()),
+        )
+        conn.executemany(
+            "INSERT INTO frontmatter (path, key, value) VALUES (?, ?, ?)",
+            [(path, str(key), json.dumps(value, default=str)) for key, value in metadata.items()],
+        )
+        tags = metadata.get("tags") or []
+        if isinstance(tags, str):
+            tags = [tags]
+        conn.executemany(
+            "INSERT OR IGNORE INTO tags (path, tag) VALUES (?, ?)",
+            [(path, str(tag)) for tag in tags],
+        )
+
+
+def indexed_metadata(conn, file_path, stat):
+    """
+    Return the indexed frontmatter for a note if its mtime and size still match `stat`.
+
+    Returns:
+        - tuple: (found, metadata). `found` is False when the note is not indexed or has changed;
+          `metadata` is None for an indexed note without a header.
+    """
+    path = index_key(file_path)
+    row = conn.execute("SELECT mtime_ns, size, has_header FROM notes WHERE path = ?", (path,)).fetchone()
+    if row is None or row[0] != stat.st_mtime_ns or row[1] != stat.st_size:
+        return False, None
+    if not row[2]:
+        return True, None
+    rows = conn.execute("SELECT key, value FROM frontmatter WHERE path = ?", (path,))
+    return True, {key: json.loads(value) for key, value in rows}
+
+
+def notes_with_tag(conn, tag):
+    """List indexed notes that carry `tag`."""
+    return [row[0] for row in conn.execute("SELECT path FROM tags WHERE tag = ? ORDER BY path", (tag,))]
+
+
+def notes_missing_key(conn, key):
+    """List indexed notes whose frontmatter has no `key` (e.g. `category`)."""
+    return [row[0] for row in conn.execute(
+        "SELECT path FROM notes WHERE path NOT IN (SELECT path FROM frontmatter WHERE key = ?) ORDER BY path", (key,)
+    )]
+
+
+def prune_missing(conn):
+    """Drop index rows for notes that no longer exist on disk, returning how many were removed."""
+    missing = [(path,) for (path,) in conn.execute("SELECT path FROM notes") if not os.path.exists(path)]
+    with conn:
+        conn.executemany("DELETE FROM notes WHERE path = ?", missing)
+    return len(missing)
@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from scripts.discovery import iter_notes, matches_any, DEFAULT_INCLUDE, DEFAULT_PRUNE_DIRS
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Detect changed notes by periodically comparing (mtime, size) snapshots of the folder."""
+
+    def __init__(self, folder_path, include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS):
+        self.folder_path = folder_path
+        self.include = include
+        self.exclude = exclude
+        self.prune_dirs = prune_dirs
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for entry in iter_notes(self.folder_path, self.include, self.exclude, self.prune_dirs):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # Deleted between listing and stat
+            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout):
+        """Wait `timeout` seconds, then return the set of notes created or modified since the last call."""
+        time.sleep(timeout)
+        snapshot = self._scan()
+        changed = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Detect changed notes with Linux inotify, watching every non-pruned folder recursively."""
+
+    def __init__(self, folder_path, include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS):
+        self.folder_path = folder_path
+        self.include = include
+        self.exclude = exclude
+        self.prune_dirs = set(prune_dirs)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        self._watch_tree(folder_path)
+
+    def _rel_path(self, path):
+        return os.path.relpath(path, self.folder_path).replace(os.sep, "/")
+
+    def _watch_tree(self, dir_path):
+        """Add a watch on a folder and all of its non-pruned subfolders."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            print(f"Error watching {dir_path}: {os.strerror(ctypes.get_errno())}")
+            return
+        self.watches[wd] = dir_path
+        try:
+            with os.scandir(dir_path) as it:
+                subdirs = [e.path for e in it if e.is_dir(follow_symlinks=False) and self._keep_dir(e.path)]
+        except OSError:
+            return
+        for subdir in subdirs:
+            self._watch_tree(subdir)
+
+    def _keep_dir(self, path):
+        return os.path.basename(path) not in self.prune_dirs and not matches_any(self._rel_path(path), self.exclude)
+
+    def _is_note(self, path):
+        rel_path = self._rel_path(path)
+        return matches_any(rel_path, self.include) and not matches_any(rel_path, self.exclude)
+
+    def changes(self, timeout):
+        """Wait up to `timeout` seconds for events and return the set of notes written or moved in."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return set()
+            raise
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: report every note and let the manifest sort out what changed
+                changed.update(e.path for e in iter_notes(self.folder_path, self.include, self.exclude, self.prune_dirs))
+                continue
+            dir_path = self.watches.get(wd)
+            if dir_path is None or not name:
+                continue
+            path = os.path.join(dir_path, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self._keep_dir(path):
+                    self._watch_tree(path)
+                    changed.update(e.path for e in iter_notes(path, self.include, self.exclude, self.prune_dirs))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and self._is_note(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(folder_path, include=DEFAULT_INCLUDE, exclude=(), prune_dirs=DEFAULT_PRUNE_DIRS, polling=False):
+    """Use inotify on Linux and fall back to polling elsewhere or if inotify is unavailable."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder_path, include, exclude, prune_dirs)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling.")
+    return PollingWatcher(folder_path, include, exclude, prune_dirs)
+
+
+class Debouncer:
+    """Hold changed paths until they have been quiet for `delay` seconds, so bursts of editor saves become one update."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.pending = {}
+
+    def add(self, paths, now):
+        for path in paths:
+            self.pending[path] = now
+
+    def due(self, now):
+        """Return (and forget) the paths whose last change is at least `delay` seconds old."""
+        ready = sorted(path for path, last in self.pending.items() if now - last >= self.delay)
+        for path in ready:
+            del self.pending[path]
+        return ready
+
+    def next_timeout(self, now, default):
+        """Seconds until the next pending path becomes due, capped at `default`."""
+        if not self.pending:
+            return default
+        return max(0.0, min(default, min(self.pending.values()) + self.delay - now))
+
+
+def watch_folder(watcher, handle_changes, debounce=2.0, poll_interval=1.0, should_stop=lambda: False):
+    """
+    Run until `should_stop()` returns True, passing debounced batches of changed notes to `handle_changes`.
+
+    Parameters:
+        - watcher (InotifyWatcher | PollingWatcher): Source of changed paths.
+        - handle_changes (callable): Called with a list of note paths that are ready to process.
+        - debounce (float): Quiet period in seconds before a changed note is processed.
+        - poll_interval (float): Maximum time to wait for events between checks.
+        - should_stop (callable): Returns True to end the loop.
+    """
+    debouncer = Debouncer(debounce)
+    while not should_stop():
+        changed = watcher.changes(debouncer.next_timeout(time.monotonic(), poll_interval))
+        debouncer.add(changed, time.monotonic())
+        ready = [path for path in debouncer.due(time.monotonic()) if os.path.exists(path)]
+        if ready:
+            handle_changes(ready)
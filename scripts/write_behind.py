@@ -0,0 +1,81 @@
+import os
+import threading
+from collections import OrderedDict, deque
+
+DEFAULT_MAX_PENDING = 64
+
+
+class WriteBehind:
+    """
+    Bounded write-behind queue: note writes are applied by a dedicated writer thread,
+    so classifying the next note does not wait for slow disks or network mounts.
+
+    Queued writes to the same path are coalesced (the newest one wins); writes are
+    otherwise applied in submission order. Completion callbacks run on the submitting
+    thread, from `submit`, `run_callbacks` and `close`, so they may update state that is
+    not thread-safe, such as the run counters or a SQLite connection.
+    """
+
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING):
+        self.max_pending = max_pending
+        self.pending = OrderedDict()  # abspath -> (write, on_done, on_error)
+        self.completed = deque()
+        self.coalesced = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path, write, on_done=None, on_error=None):
+        """
+        Queue a write, blocking while the queue is full.
+
+        Parameters:
+            - file_path (str): Note the write applies to; used to coalesce writes.
+            - write (callable): Performs the write and returns its result.
+            - on_done (callable): Called with the result once the write has been applied.
+            - on_error (callable): Called with the exception if the write fails.
+        """
+        key = os.path.abspath(file_path)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The write-behind queue is closed")
+            if key in self.pending:
+                self.coalesced += 1  # The queued write never reaches disk, so its callbacks are dropped too
+            else:
+                while len(self.pending) >= self.max_pending:
+                    self._condition.wait()
+            self.pending[key] = (write, on_done, on_error)
+            self._condition.notify_all()
+        self.run_callbacks()
+
+    def run_callbacks(self):
+        """Run the callbacks of writes that have completed since the last call."""
+        while self.completed:
+            callback, value = self.completed.popleft()
+            if callback is not None:
+                callback(value)
+
+    def close(self):
+        """Wait until every queued write has been applied, then run the remaining callbacks."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.run_callbacks()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self.pending and not self._closed:
+                    self._condition.wait()
+                if not self.pending:
+                    return  # Closed and drained
+                _, (write, on_done, on_error) = self.pending.popitem(last=False)
+                self._condition.notify_all()
+            try:
+                result = write()
+            except Exception as e:
+                self.completed.append((on_error, e))
+            else:
+                self.completed.append((on_done, result))
@@ -0,0 +1,34 @@
+import yaml
+
+# Use the libyaml C bindings when PyYAML was built with them; the pure-Python
+# classes produce the same documents, just more slowly
+try:
+    from yaml import CSafeLoader as Loader, CSafeDumper as Dumper
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader as Loader, SafeDumper as Dumper
+    LIBYAML = False
+
+
+def load(text):
+    """Parse a YAML document with the fastest available safe loader (drop-in for `yaml.safe_load`)."""
+    return yaml.load(text, Loader=Loader)
+
+
+def load_all(text):
+    """Parse every document in a YAML stream (drop-in for `yaml.safe_load_all`), returned as a list."""
+    return list(yaml.load_all(text, Loader=Loader))
+
+
+def dump(data, sort_keys=False):
+    """
+    Serialise data as block-style YAML with the fastest available safe dumper.
+
+    Parameters:
+        - data: Plain YAML data (dicts, lists, strings, numbers, dates).
+        - sort_keys (bool): Sort mapping keys instead of keeping insertion order.
+
+    Returns:
+        - str: The YAML text, ending in a newline.
+    """
+    return yaml.dump(data, Dumper=Dumper, default_flow_style=False, sort_keys=sort_keys)
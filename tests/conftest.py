@@ -0,0 +1,14 @@
+import pytest
+from scripts import tagging
+from scripts.rate_limit import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def reset_openai_state(monkeypatch):
+    """Give every test a fresh shared rate limiter and no response cache (both are process-wide in `tagging`)."""
+    monkeypatch.setattr(tagging, "RATE_LIMITER", RateLimiter())
+    monkeypatch.setattr(tagging, "RESPONSE_CACHE", None)
+    yield
+    cache = tagging.RESPONSE_CACHE
+    if cache is not None:
+        cache.close()
@@ -0,0 +1,82 @@
+import pytest
+import io
+import tarfile
+import zipfile
+from scripts.archive_io import process_archive, iter_archive_members, archive_format
+
+NOTES = {
+    "vault/tagged.md": "---\ntags:\n- Old\ncategory: ML\n---\nTagged body",
+    "vault/untagged.md": "---\ntitle: Untagged\n---\nUntagged body",
+    "vault/.obsidian/workspace.md": "settings",
+    "vault/image.png": "binary",
+}
+
+
+def _make_tar(path):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, text in NOTES.items():
+            data = text.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def _make_zip(path):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, text in NOTES.items():
+            archive.writestr(name, text)
+
+
+@pytest.mark.parametrize("make_archive, suffix", [(_make_tar, ".tar.gz"), (_make_zip, ".zip")])
+def test_process_archive_writes_updated_copy(tmp_path, make_archive, suffix):
+    source = tmp_path / f"backup{suffix}"
+    make_archive(source)
+    output = tmp_path / f"tagged{suffix}"
+    log_file = tmp_path / "log.txt"
+
+    stats = process_archive(str(source), str(output), "reference", "prompt", set(), False, False, True,
+                            log_file, tmp_path / "new_tags.txt")
+
+    assert stats["processed"] == 1
+    assert stats["skipped"] == 1
+    members = {name: data.decode("utf-8") for name, data, _ in iter_archive_members(str(output))}
+    assert set(members) == set(NOTES)
+    assert members["vault/tagged.md"] == NOTES["vault/tagged.md"]  # Skipped notes are copied unchanged
+    assert members["vault/.obsidian/workspace.md"] == "settings"
+    assert "- AI\n" in members["vault/untagged.md"]  # Other notes are still tagged
+    assert members["vault/untagged.md"].endswith("---\n\nUntagged body")
+    assert "Added YAML: untagged.md" in log_file.read_text()
+
+
+def test_process_archive_dry_run(tmp_path):
+    source = tmp_path / "backup.tar.gz"
+    _make_tar(source)
+
+    stats = process_archive(str(source), None, "reference", "prompt", set(), True, False, True,
+                            tmp_path / "log.txt", tmp_path / "new_tags.txt")
+
+    assert stats["processed"] == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["backup.tar.gz", "log.txt", "new_tags.txt"]
+
+
+@pytest.mark.parametrize("opt1", [False, True])
+def test_process_archive_keeps_scalar_frontmatter(tmp_path, opt1):
+    source, output = tmp_path / "backup.zip", tmp_path / "tagged.zip"
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr("vault/scalar.md", "---\njust a string\n---\nBody")
+        archive.writestr("vault/untagged.md", NOTES["vault/untagged.md"])
+
+    stats = process_archive(str(source), str(output), "reference", "prompt", set(), opt1, False, True,
+                            tmp_path / "log.txt", tmp_path / "new_tags.txt")
+
+    assert stats["errors"] == 1 and stats["processed"] == 1
+    members = {name: data.decode("utf-8") for name, data, _ in iter_archive_members(str(output))}
+    assert members["vault/scalar.md"] == "---\njust a string\n---\nBody"
+    assert "- AI\n" in members["vault/untagged.md"]  # Other notes are still tagged
+
+
+def test_archive_format():
+    assert archive_format("backup.zip") == "zip"
+    assert archive_format("backup.TAR.GZ") == "tar"
+    with pytest.raises(ValueError):
+        archive_format("backup.rar")
@@ -0,0 +1,132 @@
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from openai import AsyncOpenAI
+from scripts import rate_limit
+from scripts.tagging import RATE_LIMIT_RETRIES
+from scripts.file_utils import extract_yaml_header
+from scripts.async_tagging import AsyncTagger, generate_in_order
+from scripts.process_notes import process_folder
+
+
+class FakeChatServer(ThreadingHTTPServer):
+    """Local stand-in for the chat completions endpoint that records how many requests overlap."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeChatHandler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload["messages"][-1]["content"]
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            # Prompts look like "<note>|<delay>", so tests can make early notes answer last
+            note, _, delay = prompt.partition("|")
+            time.sleep(float(delay or 0.05))
+            if note == "fail":
+                self.send_response(500)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"error": {"message": "boom"}}')
+                return
+            body = json.dumps({
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": payload["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"tags: [{note}]\ncategory: Test"}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+@pytest.fixture
+def server():
+    server = FakeChatServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+async def collect(server, contents, concurrency):
+    client = AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+    tagger = AsyncTagger("reference", "{target_content}", concurrency=concurrency, client=client)
+    try:
+        jobs = ((i, content) for i, content in enumerate(contents))
+        return [item async for item in generate_in_order(jobs, tagger.generate, concurrency)], tagger
+    finally:
+        await tagger.close()
+
+
+def test_results_arrive_in_order_within_the_concurrency_limit(server):
+    contents = [f"n{i}|{0.2 if i == 0 else 0.02}" for i in range(12)]  # The first note is the slowest
+
+    results, tagger = asyncio.run(collect(server, contents, concurrency=3))
+
+    assert [key for key, _ in results] == list(range(12))
+    assert [metadata["tags"] for _, metadata in results] == [[f"n{i}"] for i in range(12)]
+    assert server.max_in_flight == 3
+    assert tagger.errors == 0
+
+
+def test_a_failed_request_only_affects_its_note(server, monkeypatch):
+    monkeypatch.setattr(rate_limit, "ERROR_BACKOFF", 0.01)
+    results, tagger = asyncio.run(collect(server, ["a|0.01", "fail|0.01", "c|0.01"], concurrency=2))
+
+    assert [metadata for _, metadata in results] == [
+        {"tags": ["a"], "aliases": [], "category": "Test", "phase": "Unknown", "topic": "General",
+         "filename": "untitled.py"},
+        {},
+        {"tags": ["c"], "aliases": [], "category": "Test", "phase": "Unknown", "topic": "General",
+         "filename": "untitled.py"},
+    ]
+    assert tagger.errors == 1
+    assert server.requests == 2 + 1 + RATE_LIMIT_RETRIES  # The 500 is retried before giving up
+
+
+def test_process_folder_with_concurrency(tmp_path, server, monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for i in range(6):
+        (notes_dir / f"note{i}.md").write_text(f"note{i}|0.05")
+    (notes_dir / "tagged.md").write_text("---\ntags: [done]\n---\ntagged|0.05")
+
+    stats = process_folder(str(notes_dir), "reference", "{target_content}", set(), True, False, False,
+                           tmp_path / "log.txt", tmp_path / "new_tags.txt",
+                           manifest_file=str(tmp_path / "manifest.json"), concurrency=4)
+
+    assert stats["processed"] == 7 and "llm_errors" not in stats
+    assert server.requests == 7 and server.max_in_flight > 1
+    assert (notes_dir / "note3.md").read_text().startswith("---\ntags:\n- note3\n")
+    merged, _ = extract_yaml_header((notes_dir / "tagged.md").read_text())
+    assert sorted(merged["tags"]) == ["done", "tagged"]  # Merged with the existing header
@@ -0,0 +1,85 @@
+import json
+from scripts.batch import batch_request, load_batch_results
+from scripts.file_utils import extract_yaml_header
+from scripts.process_notes import process_folder
+
+
+def result_line(custom_id, content=None, status_code=200, error=None):
+    """A line of a Batch API output file, as the provider returns it."""
+    body = {"error": {"message": "server error"}} if status_code != 200 else {
+        "id": "chatcmpl-1", "object": "chat.completion", "model": "gpt-4-turbo",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    }
+    return json.dumps({"id": f"batch_req_{custom_id[:8]}", "custom_id": custom_id,
+                       "response": {"status_code": status_code, "request_id": "req_1", "body": body}, "error": error})
+
+
+def test_batch_request_is_stable_and_follows_the_batch_format():
+    request = batch_request("Body", "reference", "Tag this: {target_content}")
+
+    assert request == batch_request("Body", "reference", "Tag this: {target_content}")
+    assert request["custom_id"] != batch_request("Body!", "reference", "Tag this: {target_content}")["custom_id"]
+    assert request["method"] == "POST" and request["url"] == "/v1/chat/completions"
+    assert request["body"]["model"] == "gpt-4-turbo"
+    assert request["body"]["messages"][-1] == {"role": "user", "content": "Tag this: Body"}
+
+
+def test_load_batch_results(tmp_path):
+    results_file = tmp_path / "results.jsonl"
+    results_file.write_text("\n".join([
+        result_line("ok", "tags: [a]\ncategory: Test"),
+        result_line("failed", status_code=500),
+        result_line("expired", error={"code": "batch_expired", "message": "not completed in time"}),
+        result_line("not-yaml", "tags: [unclosed"),
+        "{truncated",
+        "",
+    ]))
+
+    results = load_batch_results(str(results_file))
+
+    assert results["ok"]["tags"] == ["a"] and results["ok"]["category"] == "Test"
+    assert results == {"ok": results["ok"], "failed": None, "expired": None, "not-yaml": None}
+
+
+def test_export_then_ingest(tmp_path):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name, body in [("a.md", "Alpha"), ("b.md", "Beta"), ("c.md", "Gamma"), ("copy.md", "Alpha")]:
+        (notes_dir / name).write_text(body)
+    (notes_dir / "edited.md").write_text("Before")
+    args = (str(notes_dir), "reference", "{target_content}", set(), True, False, False,
+            tmp_path / "log.txt", tmp_path / "new_tags.txt")
+    manifest_file = str(tmp_path / "manifest.json")
+    requests_file = tmp_path / "batch_requests.jsonl"
+
+    exported = process_folder(*args, manifest_file=manifest_file, batch_export_file=str(requests_file))
+
+    requests = [json.loads(line) for line in requests_file.read_text().splitlines()]
+    by_body = {request["body"]["messages"][-1]["content"]: request["custom_id"] for request in requests}
+    assert sorted(by_body) == ["Alpha", "Before", "Beta", "Gamma"]
+    assert exported["batch_requests"] == 4 and exported["batch_duplicates"] == 1
+    assert (notes_dir / "a.md").read_text() == "Alpha"  # Exporting leaves notes alone
+
+    # The provider's results: Gamma failed, and edited.md changed after the export
+    (tmp_path / "results.jsonl").write_text("\n".join([
+        result_line(by_body["Alpha"], "tags: [alpha]\ncategory: Letters"),
+        result_line(by_body["Beta"], "tags: [beta]\ncategory: Letters"),
+        result_line(by_body["Gamma"], status_code=500),
+        result_line(by_body["Before"], "tags: [stale]"),
+    ]))
+    (notes_dir / "edited.md").write_text("After")
+
+    stats = process_folder(*args, manifest_file=manifest_file,
+                           batch_results=load_batch_results(str(tmp_path / "results.jsonl")))
+
+    assert stats["batch_applied"] == 3 and stats["batch_failed"] == 1 and stats["batch_missing"] == 1
+    for name in ("a.md", "copy.md"):
+        metadata, body = extract_yaml_header((notes_dir / name).read_text())
+        assert metadata["tags"] == ["alpha"] and body.strip() == "Alpha"
+    assert (notes_dir / "c.md").read_text() == "Gamma"
+    assert (notes_dir / "edited.md").read_text() == "After"
+
+    # Only the notes that are still untagged are exported again
+    process_folder(*args, manifest_file=manifest_file, batch_export_file=str(requests_file))
+    bodies = sorted(json.loads(line)["body"]["messages"][-1]["content"] for line in requests_file.read_text().splitlines())
+    assert bodies == ["After", "Gamma"]
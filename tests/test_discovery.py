@@ -0,0 +1,89 @@
+import pytest
+import os
+from scripts.discovery import iter_notes, matches_any, parse_shard, shard_of, in_shard, shard_path
+
+
+@pytest.fixture
+def vault(tmp_path):
+    """Build a small vault with notes, attachments and Obsidian settings."""
+    for rel_path in [
+        "a.md",
+        "sub/b.md",
+        "sub/deeper/c.md",
+        "sub/image.png",
+        ".obsidian/workspace.md",
+        ".trash/deleted.md",
+        "templates/template.md",
+    ]:
+        path = tmp_path / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("content")
+    return tmp_path
+
+
+def _rel_paths(root, entries):
+    return sorted(os.path.relpath(e.path, root).replace(os.sep, "/") for e in entries)
+
+
+def test_iter_notes_prunes_default_dirs(vault):
+    notes = _rel_paths(vault, iter_notes(str(vault)))
+    assert notes == ["a.md", "sub/b.md", "sub/deeper/c.md", "templates/template.md"]
+
+
+def test_iter_notes_include_exclude(vault):
+    notes = _rel_paths(vault, iter_notes(str(vault), exclude=("templates",)))
+    assert "templates/template.md" not in notes
+
+    notes = _rel_paths(vault, iter_notes(str(vault), include=("*.png",)))
+    assert notes == ["sub/image.png"]
+
+    notes = _rel_paths(vault, iter_notes(str(vault), exclude=("sub/deeper/*",)))
+    assert "sub/deeper/c.md" not in notes
+    assert "sub/b.md" in notes
+
+
+def test_iter_notes_parallel_matches_sequential(vault):
+    sequential = _rel_paths(vault, iter_notes(str(vault)))
+    parallel = _rel_paths(vault, iter_notes(str(vault), workers=4))
+    assert parallel == sequential
+
+
+def test_iter_notes_entries_carry_stat(vault):
+    entries = list(iter_notes(str(vault)))
+    assert all(e.stat().st_size == len("content") for e in entries)
+
+
+def test_matches_any():
+    assert matches_any("sub/note.md", ("*.md",))
+    assert matches_any("sub/note.md", ("sub/*",))
+    assert not matches_any("other/note.md", ("sub/*",))
+
+
+def test_shards_cover_vault_exactly_once(tmp_path):
+    for i in range(50):
+        (tmp_path / f"note{i}.md").write_text("content")
+    all_notes = {e.path for e in iter_notes(str(tmp_path))}
+
+    shards = [{p for p in all_notes if in_shard(p, str(tmp_path), (k, 3))} for k in (1, 2, 3)]
+
+    assert set().union(*shards) == all_notes
+    assert sum(len(s) for s in shards) == len(all_notes)
+    assert all(shards)  # 50 notes over 3 shards: none should be empty
+
+
+def test_shard_of_is_stable():
+    assert shard_of("sub/note.md", 4) == shard_of("sub/note.md", 4)
+    assert 1 <= shard_of("sub/note.md", 4) <= 4
+    assert in_shard("/vault/a.md", "/vault", None)
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    for invalid in ("0/4", "5/4", "a/b", "3"):
+        with pytest.raises(ValueError):
+            parse_shard(invalid)
+
+
+def test_shard_path():
+    assert shard_path("logs/process_log.txt", (1, 4)) == "logs/process_log.shard-1-of-4.txt"
+    assert shard_path("logs/process_log.txt", None) == "logs/process_log.txt"
@@ -1,5 +1,7 @@
 import pytest
-from scripts.file_utils import extract_yaml_header, load_file_content, write_updated_file
+from scripts.file_utils import extract_yaml_header, load_file_content, write_updated_file, probe_yaml_header, find_frontmatter, \
+    rewrite_header, rewritten_content, atomic_output, fsync_dirs, DURABILITY_POLICIES, \
+    parse_many
 import yaml
 import os
 
@@ -47,3 +49,144 @@ category: Data Science
 Test note content."""
     
     assert content.strip() == expected_content.strip()  # Strip to avoid whitespace issues
+
+
+def test_probe_yaml_header(tmp_path):
+    file_path = tmp_path / "test.md"
+    file_path.write_bytes(b"---\ntags:\n  - AI\ncategory: ML\n---\nBody text\n--- not a header\n")
+
+    metadata, body_offset = probe_yaml_header(file_path)
+
+    assert metadata == {"tags": ["AI"], "category": "ML"}
+    assert file_path.read_bytes()[body_offset:] == b"Body text\n--- not a header\n"
+
+def test_probe_yaml_header_without_frontmatter(tmp_path):
+    file_path = tmp_path / "test.md"
+    file_path.write_text("Just a body\n---\nwith a rule")
+    assert probe_yaml_header(file_path) == (None, None)
+
+    file_path.write_text("---\ntags: [AI]\nno closing delimiter")
+    assert probe_yaml_header(file_path) == (None, None)
+
+def test_extract_yaml_header_bom_crlf_and_padded_delimiters():
+    content = "﻿---\r\ntags:\r\n  - AI\r\n---  \r\nBody\r\n"
+    yaml_data, body = extract_yaml_header(content)
+    assert yaml_data == {"tags": ["AI"]}
+    assert body == "Body"
+
+def test_extract_yaml_header_ignores_rules_without_header():
+    content = "Intro\n---\nnot: a header\n---\nMore"
+    assert extract_yaml_header(content) == (None, content)
+
+def test_find_frontmatter_offsets():
+    content = "---\ncategory: ML\n---\nBody with --- inside\n---\n"
+    header_start, header_end, body_start = find_frontmatter(content)
+    assert content[header_start:header_end] == "category: ML\n"
+    assert content[body_start:] == "Body with --- inside\n---\n"
+
+    assert find_frontmatter("---\ntags: [AI]\nno closing delimiter") is None
+
+_HEADER = b"---\ntags:\n- AI\n---\n"
+_CRLF_HEADER = b"---\r\ntags:\r\n- AI\r\n---\r\n"
+
+@pytest.mark.parametrize("original, rewritten", [
+    (b"---\ntags: [Old]\n---\n\n  Indented body\r\nwith --- rule\n\n\n", _HEADER + b"\n  Indented body\r\nwith --- rule\n\n\n"),
+    (b"\xef\xbb\xbf---\r\ntags: [Old]\r\n---\r\nBody\r\n", _CRLF_HEADER + b"Body\r\n"),
+    (b"---\ntags: [Old]\n---", _HEADER),
+    (b"\n\n  Body without header\n---\n", _HEADER + b"\n  Body without header\n---\n"),
+    (b"    code block\nBody", _HEADER + b"\n    code block\nBody"),  # Indentation is Markdown, not padding
+    (b"\r\nBody\r\nmore\r\n", _CRLF_HEADER + b"\r\nBody\r\nmore\r\n"),
+    (b"\xef\xbb\xbf\nBody with BOM", _HEADER + b"\nBody with BOM"),
+])
+def test_rewrite_header_keeps_body_bytes(tmp_path, original, rewritten):
+    file_path = tmp_path / "note.md"
+    file_path.write_bytes(original)
+    content_before = load_file_content(file_path)
+
+    header = rewrite_header(file_path, {"tags": ["AI"]})
+
+    assert file_path.read_bytes() == rewritten
+    assert rewritten_content(content_before, header) == load_file_content(file_path)
+    assert list(tmp_path.iterdir()) == [file_path]  # No temp files left behind
+
+def test_rewrite_header_to_another_path(tmp_path):
+    source, dest = tmp_path / "a.md", tmp_path / "b.md"
+    source.write_bytes(b"---\ncategory: Old\n---\nBody\n")
+    rewrite_header(source, {"category": "New"}, dest)
+    assert source.read_bytes() == b"---\ncategory: Old\n---\nBody\n"
+    assert dest.read_bytes() == b"---\ncategory: New\n---\nBody\n"
+
+def test_atomic_output_failure_keeps_original(tmp_path):
+    file_path = tmp_path / "note.md"
+    file_path.write_bytes(b"original")
+
+    with pytest.raises(RuntimeError):
+        with atomic_output(file_path) as f:
+            f.write(b"partial")
+            raise RuntimeError("killed mid-write")
+
+    assert file_path.read_bytes() == b"original"
+    assert list(tmp_path.iterdir()) == [file_path]
+
+@pytest.mark.parametrize("durability", DURABILITY_POLICIES)
+def test_write_updated_file_durability(tmp_path, durability):
+    file_path = tmp_path / "note.md"
+    file_path.write_text("---\ntags: [Old]\n---\nBody")
+    os.chmod(file_path, 0o640)
+    pending_dirs = set()
+
+    write_updated_file(file_path, {"tags": ["AI"]}, "Body", durability=durability, pending_dirs=pending_dirs)
+
+    assert file_path.read_text() == "---\ntags:\n- AI\n---\nBody"
+    assert pending_dirs == ({str(tmp_path)} if durability == "batch" else set())
+    if os.name != "nt":
+        assert file_path.stat().st_mode & 0o777 == 0o640
+    fsync_dirs(pending_dirs)
+
+def test_batch_durability_fsyncs_the_note_and_defers_its_folder(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+    pending_dirs = set()
+
+    with atomic_output(tmp_path / "note.md", durability="batch", pending_dirs=pending_dirs) as f:
+        f.write(b"Body")
+        note_fd = f.fileno()
+
+    assert synced == [note_fd]  # The note itself, before the rename; not its folder
+    assert pending_dirs == {str(tmp_path)}
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permissions")
+def test_atomic_output_new_file_follows_umask(tmp_path):
+    old_umask = os.umask(0o027)
+    try:
+        with atomic_output(tmp_path / "note.md") as f:
+            f.write(b"Body")
+        assert os.umask(0o027) == 0o027  # Left as it was
+    finally:
+        os.umask(old_umask)
+
+    assert (tmp_path / "note.md").stat().st_mode & 0o777 == 0o640
+
+def test_atomic_output_rejects_unknown_policy(tmp_path):
+    with pytest.raises(ValueError):
+        with atomic_output(tmp_path / "note.md", durability="sometimes"):
+            pass
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_parse_many_columnar(tmp_path, workers):
+    (tmp_path / "a.md").write_text("---\ntags: [AI, ML]\ncategory: Tech\n---\nA")
+    (tmp_path / "b.md").write_text("No header")
+    (tmp_path / "c.md").write_text("---\ntags: AI\ntitle: C\n---\nC")
+    (tmp_path / "d.md").write_text("---\ntags: [unclosed\n---\nD")
+    paths = [tmp_path / name for name in ("a.md", "b.md", "c.md", "d.md")]
+
+    table = parse_many(paths, workers=workers)
+
+    assert table.paths == [str(path) for path in paths]
+    assert table.has_header == [True, False, True, False]
+    assert table.columns == {"category": ["Tech", None, None, None], "title": [None, None, "C", None]}
+    assert table.tag_names == ["AI", "ML"]
+    assert [table.tags(row) for row in range(len(table))] == [["AI", "ML"], [], ["AI"], []]
+    assert table.rows_with_tag("AI") == [0, 2]
+    assert list(table.errors) == [str(paths[3])]
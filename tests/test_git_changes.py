@@ -0,0 +1,67 @@
+import pytest
+import shutil
+import subprocess
+from scripts.git_changes import (
+    changed_notes, range_end, resolve_commit, load_last_commit, save_last_commit
+)
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def _commit_all(repo, message):
+    _git(repo, "add", "-A")
+    _git(repo, "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", message)
+
+
+@pytest.fixture
+def vault_repo(tmp_path):
+    """A git repo with a `notes` folder and one initial commit."""
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "old.md").write_text("old")
+    (notes / "untouched.md").write_text("untouched")
+    (tmp_path / "outside.md").write_text("outside")
+    _git(tmp_path, "init", "-q")
+    _commit_all(tmp_path, "initial")
+    return tmp_path
+
+
+def test_changed_notes_lists_added_and_modified_notes(vault_repo):
+    notes = vault_repo / "notes"
+    first = resolve_commit(str(notes), "HEAD")
+
+    (notes / "old.md").write_text("old, edited")
+    (notes / "new.md").write_text("new")
+    (notes / "image.png").write_bytes(b"")
+    (notes / ".obsidian").mkdir()
+    (notes / ".obsidian" / "settings.md").write_text("ignored")
+    (vault_repo / "outside.md").write_text("outside, edited")
+    _commit_all(vault_repo, "edit notes")
+
+    changed = changed_notes(str(notes), f"{first}..HEAD")
+
+    assert sorted(changed) == [str(notes / "new.md"), str(notes / "old.md")]
+    assert changed_notes(str(notes), "HEAD..HEAD") == []
+
+
+def test_range_end():
+    assert range_end("abc..def") == "def"
+    assert range_end("abc...") == "HEAD"
+    assert range_end("abc") == "HEAD"
+
+
+def test_resolve_commit_rejects_unknown_revision(vault_repo):
+    with pytest.raises(RuntimeError):
+        resolve_commit(str(vault_repo), "no-such-revision")
+
+
+def test_last_commit_round_trip(tmp_path):
+    state_file = tmp_path / "git_state.json"
+    assert load_last_commit(state_file) is None
+
+    save_last_commit(state_file, "abc123")
+    assert load_last_commit(state_file) == "abc123"
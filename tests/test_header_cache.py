@@ -0,0 +1,68 @@
+import os
+import json
+import datetime
+from scripts.header_cache import HeaderCache
+
+
+def test_cache_hit_requires_matching_stat(tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("---\ntags: [AI]\n---\nBody")
+    cache = HeaderCache()
+
+    assert cache.get(note, os.stat(note)) == (False, None)
+    cache.put(note, os.stat(note), {"tags": ["AI"]})
+    assert cache.get(note, os.stat(note)) == (True, {"tags": ["AI"]})
+
+    note.write_text("---\ntags: [AI, NLP]\n---\nEdited body")
+    assert cache.get(note, os.stat(note)) == (False, None)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HeaderCache(max_entries=2)
+    notes = []
+    for name in ("a.md", "b.md", "c.md"):
+        note = tmp_path / name
+        note.write_text(name)
+        notes.append(note)
+
+    cache.put(notes[0], os.stat(notes[0]), {"n": "a"})
+    cache.put(notes[1], os.stat(notes[1]), {"n": "b"})
+    cache.get(notes[0], os.stat(notes[0]))  # a is now more recent than b
+    cache.put(notes[2], os.stat(notes[2]), {"n": "c"})
+
+    assert cache.get(notes[1], os.stat(notes[1]))[0] is False
+    assert cache.get(notes[0], os.stat(notes[0]))[0] is True
+
+
+def test_cache_persists_across_runs(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    note = tmp_path / "note.md"
+    note.write_text("Body")
+
+    cache = HeaderCache(cache_file)
+    cache.put(note, os.stat(note), None)
+    cache.save()
+
+    reloaded = HeaderCache(cache_file)
+    assert reloaded.get(note, os.stat(note)) == (True, None)
+
+
+def test_cache_is_stored_as_json_and_keeps_yaml_types(tmp_path):
+    cache_file = tmp_path / "cache.json"
+    note = tmp_path / "note.md"
+    note.write_text("Body")
+    metadata = {"tags": ["AI"], "reviewed": datetime.date(2024, 9, 28), 2024: "a non-string key"}
+
+    cache = HeaderCache(str(cache_file))
+    cache.put(note, os.stat(note), metadata)
+    cache.save()
+
+    assert json.loads(cache_file.read_text())[0][0] == os.path.abspath(note)
+    assert HeaderCache(str(cache_file)).get(note, os.stat(note)) == (True, metadata)
+
+
+def test_corrupt_cache_starts_empty(tmp_path):
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_bytes(b"not json")
+    assert HeaderCache(str(cache_file)).entries == {}
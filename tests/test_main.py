@@ -12,7 +12,9 @@ def mock_dependencies():
          patch("scripts.tagging.identify_new_tags") as mock_identify_new_tags, \
          patch("os.path.exists") as mock_exists, \
          patch("scripts.logging_utils.log_action") as mock_log_action, \
-         patch("scripts.logging_utils.log_new_tags") as mock_log_new_tags:
+         patch("scripts.logging_utils.log_new_tags") as mock_log_new_tags, \
+         patch("main.configure_response_cache"), \
+         patch("main.configure_rate_limits"):
 
         # Mock return values for loading content
         mock_load_file_content.return_value = "mock content"
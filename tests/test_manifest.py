@@ -0,0 +1,54 @@
+from scripts.manifest import (
+    hash_text, config_version, run_mode, load_manifest, save_manifest, is_unchanged, record_result, same_metadata
+)
+
+
+def test_config_version_changes_with_reference():
+    assert config_version("ref", "prompt") == config_version("ref", "prompt")
+    assert config_version("ref", "prompt") != config_version("ref v2", "prompt")
+
+
+def test_run_mode():
+    assert run_mode(True, False, False) == "merge"
+    assert run_mode(False, True, True) == "replace-test"
+    assert run_mode(False, False, False) == "add"
+
+
+def test_record_and_check_unchanged(tmp_path):
+    note = tmp_path / "note.md"
+    manifest = {}
+    content_hash = hash_text("content")
+
+    assert not is_unchanged(manifest, note, content_hash, "v1", "merge")
+
+    record_result(manifest, note, content_hash, {"tags": ["AI"]}, "v1", "merge", "Merged YAML")
+
+    assert is_unchanged(manifest, note, content_hash, "v1", "merge")
+    assert not is_unchanged(manifest, note, hash_text("edited"), "v1", "merge")
+    assert not is_unchanged(manifest, note, content_hash, "v2", "merge")
+    assert not is_unchanged(manifest, note, content_hash, "v1", "replace")
+
+
+def test_save_and_load_manifest(tmp_path):
+    manifest_file = tmp_path / "manifest.json"
+    manifest = {}
+    record_result(manifest, "note.md", "abc", None, "v1", "add", "Skipped (No YAML Header)")
+
+    save_manifest(manifest_file, manifest)
+
+    assert load_manifest(manifest_file) == manifest
+
+
+def test_load_manifest_missing_or_corrupt(tmp_path):
+    assert load_manifest(tmp_path / "missing.json") == {}
+
+    corrupt = tmp_path / "corrupt.json"
+    corrupt.write_text("{not json")
+    assert load_manifest(corrupt) == {}
+
+
+def test_same_metadata_ignores_key_and_list_order():
+    assert same_metadata({"tags": ["AI", "ML"], "category": "X"}, {"category": "X", "tags": ["ML", "AI", "AI"]})
+    assert same_metadata(None, {})
+    assert not same_metadata({"tags": ["AI"]}, {"tags": ["AI", "ML"]})
+    assert not same_metadata({"category": "X"}, {"category": "Y"})
@@ -0,0 +1,57 @@
+import os
+from scripts.mirror import mirror_tree, link_file
+from scripts.process_notes import process_folder
+import pytest
+
+
+def make_vault(root):
+    (root / "sub").mkdir(parents=True)
+    (root / ".obsidian").mkdir()
+    (root / ".git").mkdir()
+    (root / "tagged.md").write_text("---\ntags:\n- AI\ncategory: ML\n---\nTagged")
+    (root / "sub" / "untagged.md").write_text("---\ntitle: Untagged\n---\nBody")
+    (root / "sub" / "image.png").write_bytes(b"\x89PNG")
+    (root / ".obsidian" / "app.json").write_text("{}")
+    (root / ".git" / "HEAD").write_text("ref: refs/heads/main")
+
+
+def test_mirror_tree_hardlinks_everything(tmp_path):
+    vault, mirror = tmp_path / "vault", tmp_path / "mirror"
+    make_vault(vault)
+
+    stats = mirror_tree(vault, mirror)
+
+    assert stats["mirror_hardlink"] == 4
+    assert os.path.samefile(vault / "sub" / "image.png", mirror / "sub" / "image.png")
+    assert (mirror / ".obsidian" / "app.json").exists()
+    assert not (mirror / ".git").exists()
+    assert mirror_tree(vault, mirror)["mirror_unchanged"] == 4
+
+
+def test_mirror_tree_rejects_output_inside_vault(tmp_path):
+    make_vault(tmp_path)
+    with pytest.raises(ValueError):
+        mirror_tree(tmp_path, tmp_path / "sub" / "out")
+
+
+def test_link_file_resets_a_diverged_copy(tmp_path):
+    src, dest = tmp_path / "a.md", tmp_path / "b.md"
+    src.write_text("source")
+    dest.write_text("tagged by an earlier run")
+    assert link_file(src, dest) == "hardlink"
+    assert dest.read_text() == "source"
+
+
+def test_process_folder_output_root_leaves_source_untouched(tmp_path):
+    vault, mirror = tmp_path / "vault", tmp_path / "mirror"
+    make_vault(vault)
+    before = {path: path.read_bytes() for path in vault.rglob("*") if path.is_file()}
+
+    stats = process_folder(str(vault), "reference", "prompt", set(), False, False, True,
+                           tmp_path / "log.txt", tmp_path / "new_tags.txt", output_root=str(mirror))
+
+    assert {path: path.read_bytes() for path in vault.rglob("*") if path.is_file()} == before
+    assert stats["written"] == 1 and stats["skipped"] == 1
+    assert "category: Technology" in (mirror / "sub" / "untagged.md").read_text()
+    assert not os.path.samefile(vault / "sub" / "untagged.md", mirror / "sub" / "untagged.md")
+    assert os.path.samefile(vault / "tagged.md", mirror / "tagged.md")
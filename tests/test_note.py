@@ -0,0 +1,69 @@
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from scripts.note import Note, as_note
+
+
+def test_metadata_is_read_from_the_header_alone(tmp_path):
+    file_path = tmp_path / "note.md"
+    file_path.write_text("---\ntags: [AI]\n---\nBody\n")
+    note = Note(str(file_path))
+
+    with patch("scripts.note.load_file_content") as mock_load:
+        assert note.metadata == {"tags": ["AI"]}
+        mock_load.assert_not_called()
+    assert note.content is None
+    assert note.name == "note.md"
+
+
+def test_body_is_loaded_lazily_and_released(tmp_path):
+    file_path = tmp_path / "note.md"
+    file_path.write_text("---\ntags: [AI]\n---\n\nBody\n")
+    note = Note(str(file_path))
+
+    assert note.body == "Body"
+    assert note.header_span is not None
+    assert note.metadata == {"tags": ["AI"]}
+
+    note.release_body()
+    assert note.content is None
+    assert note.metadata == {"tags": ["AI"]}  # Metadata survives without the text
+
+
+def test_from_entry_reuses_stat_and_has_no_instance_dict(tmp_path):
+    (tmp_path / "note.md").write_text("Body")
+    entry = next(os.scandir(tmp_path))
+    note = Note.from_entry(entry)
+
+    assert note.stat().st_size == 4
+    assert as_note(note) is note
+    assert as_note(entry.path).path == entry.path
+    with pytest.raises(AttributeError):
+        note.extra = 1  # __slots__ only
+
+
+def test_from_entry_stats_lazily(tmp_path):
+    (tmp_path / "note.md").write_text("Body")
+    scanned = next(os.scandir(tmp_path))
+    entry = SimpleNamespace(path=scanned.path, stat=Mock(side_effect=scanned.stat))  # DirEntry cannot be patched
+
+    note = Note.from_entry(entry)
+    entry.stat.assert_not_called()
+
+    assert note.stat().st_size == 4
+    assert note.stat().st_size == 4
+    entry.stat.assert_called_once()
+
+
+def test_written_forgets_stale_stat(tmp_path):
+    file_path = tmp_path / "note.md"
+    file_path.write_text("Body")
+    note = Note(str(file_path))
+    old_stat = note.stat()
+
+    file_path.write_text("---\ntags: [AI]\n---\nBody, longer")
+    note.written({"tags": ["AI"]})
+
+    assert note.stat().st_size != old_stat.st_size
+    assert note.metadata == {"tags": ["AI"]}
@@ -0,0 +1,156 @@
+import re
+import asyncio
+from types import SimpleNamespace
+import pytest
+import yaml
+from scripts import tagging
+from scripts.tagging import pack_notes, build_packed_prompt, parse_packed_reply, generate_packed_headers
+from scripts.async_tagging import AsyncTagger
+from scripts.file_utils import extract_yaml_header
+from scripts.process_notes import process_folder
+
+_NOTE_HEADER = re.compile(r"^=== note (\d+) ===\n(.*?)(?=\n\n=== note |\n\nThe target note above|\Z)", re.MULTILINE | re.DOTALL)
+
+
+def fake_reply(prompt):
+    """Answer a prompt the way the model is asked to: one document per packed note, tagged with its body."""
+    notes = _NOTE_HEADER.findall(prompt)
+    if not notes:
+        return f"tags: [{prompt.strip()}]"
+    if any(body == "confuse" for _, body in notes):
+        return "---\nid: 1\ntags: [only one]\n"
+    return "".join(f"---\nid: {note_id}\ntags: [{body}]\ncategory: Test\n" for note_id, body in notes)
+
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                           usage=None)
+
+
+def test_pack_notes_respects_budget_count_and_order():
+    items = [("a", "x" * 400), ("b", "x" * 400), ("long", "x" * 4000), ("c", "x" * 400), ("d", "x" * 40), ("e", "x" * 40)]
+
+    packs = list(pack_notes(items, budget=250, max_notes=2))
+
+    assert [[key for key, _ in pack] for pack in packs] == [["a", "b"], ["long"], ["c", "d"], ["e"]]
+
+
+def test_packed_prompt_numbers_the_notes():
+    prompt = build_packed_prompt(["First", "Second"], "reference", "Ref: {reference}\nNote: {target_content}")
+
+    assert prompt.startswith("Ref: reference\nNote: === note 1 ===\nFirst\n\n=== note 2 ===\nSecond\n\n")
+    assert "2 separate notes" in prompt
+
+
+def test_parse_packed_reply_orders_documents_by_id():
+    reply = "```yaml\n---\nid: 2\ntags: [b]\n---\n---\nid: 1\ntags: [a]\ncategory: Test\n---\n```"
+
+    first, second = parse_packed_reply(reply, 2)
+
+    assert first["tags"] == ["a"] and first["category"] == "Test" and "id" not in first
+    assert second["tags"] == ["b"] and second["category"] == "Uncategorized"
+
+
+@pytest.mark.parametrize("reply, error", [
+    ("---\nid: 1\ntags: [a]\n", ValueError),  # A note is missing
+    ("---\nid: 1\n---\nid: 1\n", ValueError),  # Duplicate ids
+    ("---\ntags: [a]\n---\nid: 2\n", ValueError),  # A document without an id
+    ("---\nid: 1\n---\n- not\n- a mapping\n", ValueError),
+    ("---\nid: 1\ntags: [unclosed\n", yaml.YAMLError),
+])
+def test_parse_packed_reply_rejects_mismatched_replies(reply, error):
+    with pytest.raises(error):
+        parse_packed_reply(reply, 2)
+
+
+def test_generate_packed_headers(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tagging, "_create_completion",
+                        lambda messages, estimated: calls.append(estimated) or completion(fake_reply(messages[-1]["content"])))
+
+    assert [m["tags"] for m in generate_packed_headers(["one", "two"], "reference", "{target_content}", False)] == [
+        ["one"], ["two"]]
+    assert generate_packed_headers(["one", "confuse"], "reference", "{target_content}", False) is None
+    assert len(calls) == 2 and calls[0] > 2 * tagging.COMPLETION_TOKENS  # Budgets a reply per note
+
+
+def write_notes(notes_dir, bodies):
+    notes_dir.mkdir()
+    for i, body in enumerate(bodies):
+        (notes_dir / f"note{i}.md").write_text(body)
+
+
+def test_process_folder_packs_short_notes(tmp_path, monkeypatch):
+    prompts = []
+
+    def create_completion(messages, estimated):
+        prompts.append(messages[-1]["content"])
+        return completion(fake_reply(messages[-1]["content"]))
+
+    monkeypatch.setattr(tagging, "_create_completion", create_completion)
+    notes_dir = tmp_path / "notes"
+    bodies = [f"n{i}" for i in range(9)] + ["confuse", "x" * 4000]
+    write_notes(notes_dir, bodies)
+
+    stats = process_folder(str(notes_dir), "reference", "{target_content}", set(), True, False, False,
+                           tmp_path / "log.txt", tmp_path / "new_tags.txt", order=("shortest",), pack=True)
+
+    # Packs: eight of the n notes, then the ninth with "confuse" (sent again one by one), then the long note alone
+    assert stats["processed"] == 11
+    assert stats["packed_requests"] == 2 and stats["pack_fallbacks"] == 1
+    assert len(prompts) == 1 + 1 + 2 + 1
+    for i, body in enumerate(bodies[:-1]):
+        metadata, _ = extract_yaml_header((notes_dir / f"note{i}.md").read_text())
+        assert metadata["tags"] == [body]
+
+
+class FakeAsyncClient:
+    """Just enough of `AsyncOpenAI` for `AsyncTagger`: answers every request with `fake_reply`."""
+
+    def __init__(self):
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    async def create(self, model, messages):
+        self.prompts.append(messages[-1]["content"])
+        response = completion(fake_reply(messages[-1]["content"]))
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+    async def close(self):
+        pass
+
+
+def test_async_tagger_generate_many():
+    client = FakeAsyncClient()
+    tagger = AsyncTagger("reference", "{target_content}", client=client)
+
+    async def run():
+        packed = await tagger.generate_many(["one", "two", "three"])
+        fallback = await tagger.generate_many(["confuse", "four"])
+        single = await tagger.generate_many(["five"])
+        return packed, fallback, single
+
+    packed, fallback, single = asyncio.run(run())
+
+    assert [m["tags"] for m in packed] == [["one"], ["two"], ["three"]]
+    assert [m["tags"] for m in fallback] == [["confuse"], ["four"]]
+    assert [m["tags"] for m in single] == [["five"]]
+    assert tagger.packed_requests == 2 and tagger.pack_fallbacks == 1 and tagger.errors == 0
+    assert len(client.prompts) == 1 + (1 + 2) + 1
+
+
+def test_process_folder_packs_with_concurrency(tmp_path, monkeypatch):
+    client = FakeAsyncClient()
+    monkeypatch.setattr("openai.AsyncOpenAI", lambda **kwargs: client)
+    notes_dir = tmp_path / "notes"
+    bodies = [f"n{i}" for i in range(20)]
+    write_notes(notes_dir, bodies)
+
+    stats = process_folder(str(notes_dir), "reference", "{target_content}", set(), True, False, False,
+                           tmp_path / "log.txt", tmp_path / "new_tags.txt", pack=True, concurrency=2)
+
+    assert stats["processed"] == 20 and stats["packed_requests"] == 3 and "pack_fallbacks" not in stats
+    assert len(client.prompts) == 3  # 8 + 8 + 4 notes
+    for i, body in enumerate(bodies):
+        metadata, _ = extract_yaml_header((notes_dir / f"note{i}.md").read_text())
+        assert metadata["tags"] == [body]
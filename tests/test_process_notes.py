@@ -1,8 +1,9 @@
 import pytest
 from unittest.mock import patch
-from scripts.process_notes import process_file
+from scripts.process_notes import process_file, process_folder
 import yaml
-from scripts.process_notes import merge_yaml_headers
+from scripts.process_notes import merge_yaml_headers, skip_reason
+from scripts.vault_index import open_index, notes_with_tag, notes_missing_key, index_key
 
 
 @pytest.fixture
@@ -48,7 +49,9 @@ def test_process_file(mock_dependencies):
     mock_dependencies["mock_extract_yaml_header"].assert_called_once_with("mock file content")
     mock_dependencies["mock_generate_yaml_header"].assert_called_once_with("mock body", "reference content", "prompt template", True)
     mock_dependencies["mock_identify_new_tags"].assert_called_once_with(["AI", "ML"], {"AI", "ML"})
-    mock_dependencies["mock_write_updated_file"].assert_called_once_with("test.md", {"tags": ["AI", "ML"]}, "mock body")
+    mock_dependencies["mock_write_updated_file"].assert_called_once_with(
+        "test.md", {"tags": ["AI", "ML"]}, "mock body", durability="file", pending_dirs=None
+    )
     mock_dependencies["mock_log_action"].assert_called_once_with("logs/process_log.txt", "Added YAML", "test.md")
     mock_dependencies["mock_log_new_tags"].assert_called_once_with("test.md", {"ML"}, "logs/new_tags_log.txt")
 
@@ -160,3 +163,175 @@ def test_merge_yaml_headers_parametrized(existing_yaml, new_yaml, expected_resul
     """Test merging YAML headers with parameterized cases."""
     merged = merge_yaml_headers(existing_yaml, new_yaml)
     assert merged == expected_result
+
+
+def test_process_folder_skips_unchanged_notes(tmp_path):
+    """A second run over an unchanged folder should not regenerate any metadata."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("---\ntags:\n- Old\n---\nBody A")
+    (notes_dir / "b.md").write_text("Body B")
+    manifest_file = tmp_path / "manifest.json"
+    log_file = tmp_path / "log.txt"
+    new_tags_log = tmp_path / "new_tags.txt"
+
+    args = (str(notes_dir), "reference", "prompt", set(), True, False, True, log_file, new_tags_log)
+    first = process_folder(*args, manifest_file=str(manifest_file))
+    assert first["processed"] == 2
+
+    with patch("scripts.process_notes.generate_yaml_header") as mock_generate:
+        second = process_folder(*args, manifest_file=str(manifest_file))
+        mock_generate.assert_not_called()
+    assert second["unchanged"] == 2
+
+    (notes_dir / "b.md").write_text("Body B, edited")
+    third = process_folder(*args, manifest_file=str(manifest_file))
+    assert third["unchanged"] == 1
+    assert third["processed"] == 1
+
+    forced = process_folder(*args, manifest_file=str(manifest_file), force=True)
+    assert forced["processed"] == 2
+
+
+def test_process_folder_handles_scalar_frontmatter(tmp_path):
+    """A note whose frontmatter is a plain string is reported and left alone, without aborting the run."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    scalar = "---\njust a string header\n---\nBody"
+    (notes_dir / "scalar.md").write_text(scalar)
+    (notes_dir / "tagged.md").write_text("---\ntags:\n- Old\n---\nOther body")
+
+    for opt1, opt2 in ((False, False), (True, False), (False, True)):
+        stats = process_folder(str(notes_dir), "reference", "prompt", set(), opt1, opt2, True,
+                               tmp_path / "log.txt", tmp_path / "new_tags.txt")
+        assert stats["errors"] == 1 and stats["processed"] == 1  # The other note is still processed
+        assert (notes_dir / "scalar.md").read_text() == scalar
+
+
+def test_process_file_probe_skips_tagged_note(tmp_path):
+    """With probing, an already tagged note is skipped without loading its body."""
+    file_path = tmp_path / "tagged.md"
+    file_path.write_text("---\ntags:\n- AI\ncategory: ML\n---\n" + "Long body\n" * 1000)
+    log_file = tmp_path / "log.txt"
+
+    with patch("scripts.process_notes.load_file_content") as mock_load, \
+         patch("scripts.process_notes.generate_yaml_header") as mock_generate:
+        process_file(str(file_path), "reference", "prompt", set(), False, False, True,
+                     log_file, tmp_path / "new_tags.txt", probe=True)
+        mock_load.assert_not_called()
+        mock_generate.assert_not_called()
+
+    assert "Skipped (Already Tagged): tagged.md" in log_file.read_text()
+
+
+@pytest.mark.parametrize("yaml_header, opt1, opt2, expected", [
+    (None, False, False, "Skipped (No YAML Header)"),
+    ({"tags": ["AI"], "category": "ML"}, False, False, "Skipped (Already Tagged)"),
+    ({"tags": ["AI"]}, False, False, None),
+    ({"tags": ["AI"], "category": "ML"}, True, False, None),
+    (None, False, True, None),
+])
+def test_skip_reason(yaml_header, opt1, opt2, expected):
+    assert skip_reason(yaml_header, opt1, opt2) == expected
+
+
+def test_process_folder_maintains_vault_index(tmp_path):
+    """Processed and skipped notes both end up in the vault index."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "tagged.md").write_text("---\ntags:\n- Old\ncategory: ML\n---\nBody")
+    (notes_dir / "untagged.md").write_text("---\ntitle: Untagged\n---\nBody")
+    index_file = str(tmp_path / "index.sqlite")
+
+    process_folder(str(notes_dir), "reference", "prompt", set(), False, False, True,
+                   tmp_path / "log.txt", tmp_path / "new_tags.txt", probe=True, index_file=index_file)
+
+    conn = open_index(index_file)
+    try:
+        assert notes_with_tag(conn, "Old") == [index_key(notes_dir / "tagged.md")]
+        assert notes_with_tag(conn, "AI") == [index_key(notes_dir / "untagged.md")]  # Test-mode metadata
+        assert notes_missing_key(conn, "category") == []
+    finally:
+        conn.close()
+
+
+def test_vault_index_is_rebuilt_for_unchanged_notes_and_pruned(tmp_path):
+    """A new index fills up from notes the manifest skips, and loses notes deleted since."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name in ("kept.md", "deleted.md"):
+        (notes_dir / name).write_text("---\ntags:\n- Old\ncategory: ML\n---\nBody")
+    args = (str(notes_dir), "reference", "prompt", set(), False, False, True, tmp_path / "log.txt", tmp_path / "new_tags.txt")
+    manifest_file, index_file = str(tmp_path / "manifest.json"), str(tmp_path / "index.sqlite")
+
+    process_folder(*args, manifest_file=manifest_file)  # No index yet
+    stats = process_folder(*args, manifest_file=manifest_file, index_file=index_file)
+
+    assert stats["unchanged"] == 2
+    conn = open_index(index_file)
+    try:
+        assert notes_with_tag(conn, "Old") == sorted(index_key(notes_dir / name) for name in ("deleted.md", "kept.md"))
+    finally:
+        conn.close()
+
+    (notes_dir / "deleted.md").unlink()
+    stats = process_folder(*args, manifest_file=manifest_file, index_file=index_file)
+
+    assert stats["index_pruned"] == 1
+    conn = open_index(index_file)
+    try:
+        assert notes_with_tag(conn, "Old") == [index_key(notes_dir / "kept.md")]
+    finally:
+        conn.close()
+
+
+def test_failed_generations_are_counted(tmp_path):
+    """Notes the model returned nothing for are counted, so callers know the run left them untagged."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "note.md").write_text("Body")
+
+    with patch("scripts.process_notes.generate_yaml_header", return_value={}):
+        stats = process_folder(str(notes_dir), "reference", "prompt", set(), True, False, False,
+                               tmp_path / "log.txt", tmp_path / "new_tags.txt")
+
+    assert stats["empty_generations"] == 1 and not stats["errors"]
+
+
+def test_process_folder_reuses_cached_headers(tmp_path):
+    """A probing rerun over unchanged tagged notes is served from the header cache."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name in ("a.md", "b.md"):
+        (notes_dir / name).write_text("---\ntags:\n- AI\ncategory: ML\n---\nBody")
+    args = (str(notes_dir), "reference", "prompt", set(), False, False, True, tmp_path / "log.txt", tmp_path / "new_tags.txt")
+    cache_file = str(tmp_path / "cache.json")
+
+    first = process_folder(*args, probe=True, header_cache_file=cache_file)
+    assert first["header_cache_misses"] == 2
+
+    with patch("scripts.process_notes.probe_yaml_header") as mock_probe:
+        second = process_folder(*args, probe=True, header_cache_file=cache_file)
+        mock_probe.assert_not_called()
+    assert second["header_cache_hits"] == 2
+    assert second["skipped"] == 2
+
+
+def test_process_folder_does_not_rewrite_unchanged_metadata(tmp_path):
+    """Merging metadata a note already has leaves the file (and its mtime) alone."""
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    note = notes_dir / "a.md"
+    args = (str(notes_dir), "reference", "prompt", set(), True, False, True, tmp_path / "log.txt", tmp_path / "new_tags.txt")
+    note.write_text("Body")
+
+    first = process_folder(*args)
+    assert first["written"] == 1
+    written = note.read_bytes()
+    mtime_ns = note.stat().st_mtime_ns
+
+    second = process_folder(*args)
+    assert second["unchanged_yaml"] == 1
+    assert "written" not in second
+    assert note.read_bytes() == written
+    assert note.stat().st_mtime_ns == mtime_ns
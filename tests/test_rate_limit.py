@@ -0,0 +1,231 @@
+import json
+import asyncio
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import openai
+import pytest
+from openai import AsyncOpenAI, OpenAI
+from scripts import tagging
+from scripts import rate_limit
+from scripts.rate_limit import RateLimiter, estimate_tokens, parse_duration
+from scripts.async_tagging import AsyncTagger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize("value, expected", [("20ms", 0.02), ("1.5s", 1.5), ("6m0s", 360), ("1h2m", 3720), ("3", 3)])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [None, "soon", "5x"])
+def test_parse_duration_rejects_unknown_values(value):
+    assert parse_duration(value) is None
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("x" * 400, completion_tokens=50) == 150
+
+
+def test_requests_and_tokens_are_both_limited():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=600, clock=clock)
+
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(100) == 0
+    assert limiter.reserve(100) == pytest.approx(30)  # Third request of the minute: one request refills every 30s
+    assert limiter.reserve(500) == pytest.approx(60)  # Two requests and 200 tokens in the hole
+    assert limiter.waits == 2
+
+    clock.now += 60
+    assert limiter.reserve(0) == pytest.approx(30)  # Reservations made by earlier callers still count
+
+
+def test_unlimited_until_the_server_reports_limits():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+    assert all(limiter.reserve(10_000) == 0 for _ in range(100))
+
+    limiter.record({"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0"})
+    assert limiter.reserve(0) == pytest.approx(1)
+
+
+def test_headers_resync_the_buckets():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60_000, clock=clock)
+
+    # Another process shares the key: the server has less left than we think
+    limiter.record({"X-RateLimit-Remaining-Tokens": "1000", "X-RateLimit-Limit-Tokens": "90000"}, estimated_tokens=500,
+                   used_tokens=300)
+    assert limiter.reserve(1200) == pytest.approx(0)  # 1000 remaining + 200 refunded
+    assert limiter.reserve(1000) == pytest.approx(1)  # Configured 60k/min is kept: the server allows more
+
+
+def test_retry_after_holds_every_caller_back():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    limiter.record_throttled({"retry-after-ms": "2500"})
+    assert limiter.reserve(1) == pytest.approx(2.5)
+    assert limiter.reserve(1) == pytest.approx(2.5)
+
+    clock.now += 10
+    limiter.record_throttled({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "6s"})
+    assert limiter.reserve(1) == pytest.approx(6)
+    assert limiter.throttled == 2
+
+
+def test_back_off_doubles_up_to_a_cap():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    assert [limiter.back_off(attempt) or limiter.reserve(1) for attempt in range(6)] == pytest.approx(
+        [0.5, 1, 2, 4, 8, 8])
+    assert limiter.retried == 6
+
+
+def test_limiter_is_shared_across_threads():
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, clock=clock)
+    waits = []
+    lock = threading.Lock()
+
+    def reserve():
+        wait = limiter.reserve(0)
+        with lock:
+            waits.append(wait)
+
+    threads = [threading.Thread(target=reserve) for _ in range(90)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The first minute's burst goes straight through, the rest are spaced a second apart
+    assert sorted(waits) == pytest.approx([0] * 60 + list(range(1, 31)))
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        if self.server.requests == 1 and self.server.first_status == 503:
+            self.send_response(503)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"error": {"message": "Service unavailable"}}')
+            return
+        if self.server.requests == 1 and self.server.first_status == 429:
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("retry-after-ms", "200")
+            self.end_headers()
+            self.wfile.write(b'{"error": {"message": "Rate limit reached", "type": "requests"}}')
+            return
+        body = json.dumps({
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "tags: [ok]"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-ratelimit-limit-requests", "500")
+        self.send_header("x-ratelimit-remaining-requests", "499")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    server.requests = 0
+    server.first_status = 429
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_throttled_requests_are_retried_through_the_limiter(server):
+    limiter = RateLimiter()
+
+    async def run():
+        client = AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        tagger = AsyncTagger("reference", "{target_content}", client=client, limiter=limiter)
+        try:
+            return await tagger.generate("note"), tagger.errors
+        finally:
+            await tagger.close()
+
+    metadata, errors = asyncio.run(run())
+
+    assert metadata["tags"] == ["ok"] and errors == 0
+    assert server.requests == 2
+    assert limiter.throttled == 1 and limiter.waits == 1
+    assert limiter.reserve(0) == 0  # Learned the 500 rpm limit from the successful response
+
+
+def test_generate_yaml_header_uses_the_shared_limiter(server, monkeypatch):
+    limiter = RateLimiter()
+    monkeypatch.setattr(tagging, "RATE_LIMITER", limiter)
+    monkeypatch.setattr(tagging, "_client", OpenAI(base_url=server.base_url, api_key="test", max_retries=0))
+
+    metadata = tagging.generate_yaml_header("note", "reference", "{target_content}", False)
+
+    assert metadata["tags"] == ["ok"]
+    assert server.requests == 2 and limiter.throttled == 1
+
+
+def test_server_errors_are_retried_with_backoff(server, monkeypatch):
+    server.first_status = 503
+    monkeypatch.setattr(rate_limit, "ERROR_BACKOFF", 0.01)
+    limiter = RateLimiter()
+    monkeypatch.setattr(tagging, "RATE_LIMITER", limiter)
+    monkeypatch.setattr(tagging, "_client", OpenAI(base_url=server.base_url, api_key="test", max_retries=0))
+
+    metadata = tagging.generate_yaml_header("note", "reference", "{target_content}", False)
+
+    assert metadata["tags"] == ["ok"]
+    assert server.requests == 2 and limiter.retried == 1 and limiter.throttled == 0
+
+
+def test_async_connection_errors_are_retried(server, monkeypatch):
+    monkeypatch.setattr(rate_limit, "ERROR_BACKOFF", 0.01)
+    limiter = RateLimiter()
+    server.first_status = 200  # Every request that reaches the server succeeds
+
+    async def run():
+        client = AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        calls = []
+
+        async def flaky_create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise openai.APIConnectionError(request=httpx.Request("POST", server.base_url))
+            return await client.chat.completions.with_raw_response.create(**kwargs)
+
+        flaky_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            with_raw_response=SimpleNamespace(create=flaky_create))), close=client.close)
+        tagger = AsyncTagger("reference", "{target_content}", client=flaky_client, limiter=limiter)
+        try:
+            return await tagger.generate("note"), tagger.errors, len(calls)
+        finally:
+            await tagger.close()
+
+    metadata, errors, calls = asyncio.run(run())
+
+    assert metadata["tags"] == ["ok"] and errors == 0 and calls == 2
+    assert limiter.retried == 1
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+import pytest
+from scripts import tagging
+from scripts.response_cache import ResponseCache, response_key
+from scripts.process_notes import process_folder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_covers_model_and_rendered_messages():
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "note"}]
+    assert response_key("m1", messages) == response_key("m1", [dict(m) for m in messages])
+    assert response_key("m1", messages) != response_key("m2", messages)
+    assert response_key("m1", messages) != response_key("m1", messages[:1] + [{"role": "user", "content": "note!"}])
+
+
+def test_replies_persist_and_expire(tmp_path):
+    clock = FakeClock()
+    cache_file = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(cache_file, ttl=60, clock=clock)
+    cache.put("a", "tags: [x]")
+    cache.close()
+
+    cache = ResponseCache(cache_file, ttl=60, clock=clock)
+    assert cache.get("a") == "tags: [x]"
+    assert cache.get("b") is None
+    clock.now += 61
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_replies_are_evicted_by_size(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=30, clock=clock)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(key, key * 10)
+    clock.now += 1
+    assert cache.get("a") == "a" * 10  # Now the most recently used
+
+    clock.now += 1
+    cache.put("d", "d" * 10)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a" * 10, "c" * 10, "d" * 10]
+
+
+@pytest.fixture
+def fake_openai(tmp_path, monkeypatch):
+    calls = []
+
+    def create_completion(messages, estimated_tokens):
+        calls.append(messages)
+        content = "tags: [cached]" if "bad" not in messages[-1]["content"] else "tags: [unclosed"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    monkeypatch.setattr(tagging, "_create_completion", create_completion)
+    monkeypatch.setattr(tagging, "RESPONSE_CACHE", None)
+    tagging.configure_response_cache(str(tmp_path / "cache.sqlite"))
+    yield calls
+    tagging.configure_response_cache(None)
+
+
+def test_generate_yaml_header_reuses_replies(fake_openai):
+    first = tagging.generate_yaml_header("note", "reference", "{target_content}", False)
+    again = tagging.generate_yaml_header("note", "reference", "{target_content}", False)
+    other = tagging.generate_yaml_header("other note", "reference", "{target_content}", False)
+
+    assert first == again and first["tags"] == ["cached"] and other["tags"] == ["cached"]
+    assert len(fake_openai) == 2
+
+    # Replies that do not parse are not cached
+    assert tagging.generate_yaml_header("bad", "reference", "{target_content}", False) == {}
+    assert tagging.generate_yaml_header("bad", "reference", "{target_content}", False) == {}
+    assert len(fake_openai) == 4
+
+
+def test_hit_rate_is_reported_per_run(tmp_path, fake_openai):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name in ("a.md", "b.md"):
+        (notes_dir / name).write_text(f"Body of {name}")
+    args = (str(notes_dir), "reference", "{target_content}", set(), True, False, False,
+            tmp_path / "log.txt", tmp_path / "new_tags.txt")
+
+    first = process_folder(*args)
+    second = process_folder(*args)  # Same bodies: the merge re-runs without asking OpenAI again
+
+    assert first["response_cache_misses"] == 2 and "response_cache_hits" not in first
+    assert second["response_cache_hits"] == 2 and "response_cache_misses" not in second
+    assert len(fake_openai) == 2
@@ -0,0 +1,66 @@
+import pytest
+import os
+from scripts.discovery import iter_notes
+from scripts.scheduler import schedule, parse_order, has_frontmatter, LARGE_NOTE_BYTES
+
+
+@pytest.fixture
+def entries(tmp_path):
+    """Four notes with known header presence, sizes and modification times."""
+    notes = {
+        "old_tagged.md": ("---\ntags: [AI]\n---\n" + "x" * 100, 1_000),
+        "new_untagged.md": ("y" * 500, 4_000),
+        "huge_untagged.md": ("z" * (LARGE_NOTE_BYTES + 1), 3_000),
+        "small_tagged.md": ("---\ntags: [AI]\n---\nshort", 2_000),
+    }
+    for name, (text, mtime) in notes.items():
+        path = tmp_path / name
+        path.write_text(text)
+        os.utime(path, (mtime, mtime))
+    return list(iter_notes(str(tmp_path)))
+
+
+def _names(entries):
+    return [e.name for e in entries]
+
+
+def test_missing_yaml_first_then_recent(entries):
+    ordered = schedule(entries, ("missing-yaml", "recent"))
+    assert _names(ordered) == ["new_untagged.md", "huge_untagged.md", "small_tagged.md", "old_tagged.md"]
+
+
+def test_shortest_first(entries):
+    ordered = schedule(entries, ("shortest",))
+    assert _names(ordered) == ["small_tagged.md", "old_tagged.md", "new_untagged.md", "huge_untagged.md"]
+
+
+def test_largest_last_keeps_other_notes_in_order(entries):
+    ordered = schedule(entries, ("missing-yaml", "largest-last"))
+    assert _names(ordered) == ["new_untagged.md", "huge_untagged.md", "old_tagged.md", "small_tagged.md"]
+
+    ordered = schedule(entries, ("largest-last",))
+    assert _names(ordered)[-1] == "huge_untagged.md"
+    assert _names(ordered)[:-1] == [n for n in _names(entries) if n != "huge_untagged.md"]
+
+
+def test_no_order_keeps_discovery_order(entries):
+    assert schedule(iter(entries), ()) == entries
+
+
+def test_parse_order():
+    assert parse_order("missing-yaml, recent") == ("missing-yaml", "recent")
+    assert parse_order("") == ()
+    with pytest.raises(ValueError):
+        parse_order("alphabetical")
+
+
+def test_has_frontmatter(tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("\n---\ntags: [AI]\n---\n")
+    assert has_frontmatter(note)
+    note.write_text("Body only")
+    assert not has_frontmatter(note)
+    note.write_bytes(b"\xef\xbb\xbf  ---\r\ntags: [AI]\r\n---\r\nBody")  # BOM and an indented delimiter
+    assert has_frontmatter(note)
+    note.write_text("---\ntags: [AI]\nno closing delimiter")
+    assert not has_frontmatter(note)
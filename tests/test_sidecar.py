@@ -0,0 +1,69 @@
+import datetime
+from scripts.sidecar import load_sidecar, apply_sidecar
+from scripts.process_notes import process_folder
+from scripts.manifest import manifest_key
+
+
+def test_sidecar_run_then_apply(tmp_path):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    (notes_dir / "a.md").write_text("---\ntitle: A\n---\nBody A")
+    (notes_dir / "b.md").write_text("---\ntitle: B\n---\nBody B")
+    originals = {path.name: path.read_bytes() for path in notes_dir.iterdir()}
+    sidecar_file = str(tmp_path / "sidecar.ndjson")
+    manifest_file = str(tmp_path / "manifest.json")
+    args = (str(notes_dir), "reference", "prompt", set(), True, False, True, tmp_path / "log.txt", tmp_path / "new_tags.txt")
+
+    stats = process_folder(*args, manifest_file=manifest_file, sidecar_file=sidecar_file)
+
+    assert stats["sidecar"] == 2 and "written" not in stats
+    assert {path.name: path.read_bytes() for path in notes_dir.iterdir()} == originals
+    entries = load_sidecar(sidecar_file)
+    assert entries[manifest_key(notes_dir / "a.md")]["metadata"]["title"] == "A"
+
+    (notes_dir / "b.md").write_text("---\ntitle: B\n---\nBody B, edited since")
+    applied = apply_sidecar(sidecar_file, manifest_file=manifest_file)
+
+    assert applied["applied"] == 1 and applied["stale"] == 1
+    assert "category: Technology" in (notes_dir / "a.md").read_text()
+    assert (notes_dir / "a.md").read_text().endswith("Body A")
+    assert apply_sidecar(sidecar_file)["already_applied"] == 1
+
+    rerun = process_folder(*args, manifest_file=manifest_file)
+    assert rerun["unchanged"] == 1  # The applied note is not regenerated
+    assert rerun["processed"] == 1  # The edited one is
+
+
+def test_load_sidecar_keeps_latest_entry_and_skips_torn_lines(tmp_path):
+    sidecar_file = tmp_path / "sidecar.ndjson"
+    sidecar_file.write_text(
+        '{"path": "/a.md", "content_hash": "1", "action": "Added YAML", "metadata": {"tags": ["Old"]}}\n'
+        '{"path": "/a.md", "content_hash": "2", "action": "Added YAML", "metadata": {"tags": ["New"]}}\n'
+        '{"path": "/b.md", "content_ha'
+    )
+    entries = load_sidecar(sidecar_file)
+    assert list(entries) == ["/a.md"]
+    assert entries["/a.md"]["metadata"] == {"tags": ["New"]}
+
+
+def test_sidecar_keeps_yaml_types(tmp_path):
+    """Applying from the sidecar writes the same frontmatter as a direct run, dates included."""
+    note = "---\ncreated: 2024-06-22 21:06\nrecency_of_interest: 2024-09-28\nreviewed: 2024-10-01 08:30:00\n---\nBody"
+    direct_dir, sidecar_dir = tmp_path / "direct", tmp_path / "sidecar"
+    for folder in (direct_dir, sidecar_dir):
+        folder.mkdir()
+        (folder / "a.md").write_text(note)
+    logs = (tmp_path / "log.txt", tmp_path / "new_tags.txt")
+    sidecar_file = str(tmp_path / "sidecar.ndjson")
+
+    process_folder(str(direct_dir), "reference", "prompt", set(), True, False, True, *logs)
+    process_folder(str(sidecar_dir), "reference", "prompt", set(), True, False, True, *logs, sidecar_file=sidecar_file)
+    entry = load_sidecar(sidecar_file)[manifest_key(sidecar_dir / "a.md")]
+    assert entry["metadata"]["created"] == "2024-06-22 21:06"  # Not a YAML timestamp (no seconds), so a string
+    assert entry["metadata"]["reviewed"] == datetime.datetime(2024, 10, 1, 8, 30)
+    assert entry["metadata"]["recency_of_interest"] == datetime.date(2024, 9, 28)
+
+    assert apply_sidecar(sidecar_file)["applied"] == 1
+    applied = (sidecar_dir / "a.md").read_text()
+    assert applied == (direct_dir / "a.md").read_text()
+    assert "recency_of_interest: 2024-09-28\n" in applied
@@ -0,0 +1,52 @@
+import pytest
+import os
+from scripts.vault_index import (
+    open_index, update_note, indexed_metadata, notes_with_tag, notes_missing_key, prune_missing, index_key
+)
+
+
+@pytest.fixture
+def index(tmp_path):
+    conn = open_index(str(tmp_path / "index.sqlite"))
+    yield conn
+    conn.close()
+
+
+def test_update_and_query_notes(tmp_path, index):
+    tagged = tmp_path / "tagged.md"
+    tagged.write_text("---\ntags: [AI, NLP]\ncategory: ML\n---\nBody")
+    untagged = tmp_path / "untagged.md"
+    untagged.write_text("Body")
+
+    update_note(index, tagged, {"tags": ["AI", "NLP"], "category": "ML"}, "hash1")
+    update_note(index, untagged, None)
+
+    assert notes_with_tag(index, "AI") == [index_key(tagged)]
+    assert notes_missing_key(index, "category") == [index_key(untagged)]
+
+    # Re-indexing replaces the old rows rather than adding to them
+    update_note(index, tagged, {"tags": ["NLP"]}, "hash2")
+    assert notes_with_tag(index, "AI") == []
+    assert sorted(notes_missing_key(index, "category")) == sorted([index_key(tagged), index_key(untagged)])
+
+
+def test_indexed_metadata_requires_matching_stat(tmp_path, index):
+    note = tmp_path / "note.md"
+    note.write_text("---\ncategory: ML\n---\nBody")
+    update_note(index, note, {"category": "ML", "date": "2024-01-01"})
+
+    assert indexed_metadata(index, note, os.stat(note)) == (True, {"category": "ML", "date": "2024-01-01"})
+
+    note.write_text("---\ncategory: Changed\n---\nA longer body")
+    assert indexed_metadata(index, note, os.stat(note)) == (False, None)
+
+
+def test_prune_missing(tmp_path, index):
+    note = tmp_path / "note.md"
+    note.write_text("Body")
+    update_note(index, note, {"tags": ["AI"]})
+
+    note.unlink()
+
+    assert prune_missing(index) == 1
+    assert notes_with_tag(index, "AI") == []
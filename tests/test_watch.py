@@ -0,0 +1,95 @@
+import pytest
+import sys
+import time
+import threading
+from scripts.watch import PollingWatcher, InotifyWatcher, Debouncer, watch_folder
+
+
+def test_debouncer_waits_for_quiet_period():
+    debouncer = Debouncer(delay=1.0)
+    debouncer.add(["a.md"], now=0.0)
+    debouncer.add(["a.md", "b.md"], now=0.5)
+
+    assert debouncer.due(now=1.2) == []  # Both touched within the last second
+    assert debouncer.next_timeout(now=1.2, default=5.0) == pytest.approx(0.3)
+    assert debouncer.due(now=1.5) == ["a.md", "b.md"]
+    assert debouncer.pending == {}
+    assert debouncer.next_timeout(now=2.0, default=5.0) == 5.0
+
+
+def test_polling_watcher_detects_new_and_modified_notes(tmp_path):
+    existing = tmp_path / "existing.md"
+    existing.write_text("old")
+    (tmp_path / ".obsidian").mkdir()
+    watcher = PollingWatcher(str(tmp_path))
+
+    assert watcher.changes(0) == set()
+
+    existing.write_text("new content")
+    (tmp_path / "new.md").write_text("new")
+    (tmp_path / ".obsidian" / "workspace.md").write_text("ignored")
+
+    assert watcher.changes(0) == {str(existing), str(tmp_path / "new.md")}
+    assert watcher.changes(0) == set()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_detects_writes_in_new_folders(tmp_path):
+    watcher = InotifyWatcher(str(tmp_path))
+    try:
+        (tmp_path / "sub").mkdir()
+        watcher.changes(1.0)  # Picks up the new folder and starts watching it
+        note = tmp_path / "sub" / "note.md"
+        note.write_text("content")
+        (tmp_path / "image.png").write_bytes(b"")
+
+        changed = set()
+        deadline = time.monotonic() + 2.0
+        while str(note) not in changed and time.monotonic() < deadline:
+            changed |= watcher.changes(0.2)
+        assert changed == {str(note)}
+    finally:
+        watcher.close()
+
+
+def test_watch_folder_hands_over_debounced_batches(tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("content")
+
+    class FakeWatcher:
+        def __init__(self):
+            self.calls = 0
+
+        def changes(self, timeout):
+            self.calls += 1
+            return {str(note)} if self.calls <= 3 else set()  # A burst of saves
+
+    handled = []
+    watch_folder(FakeWatcher(), handled.append, debounce=0.0, poll_interval=0.0,
+                 should_stop=lambda: len(handled) >= 1)
+
+    assert handled == [[str(note)]]
+
+
+def test_watch_folder_processes_a_burst_of_writes_once(tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("draft")
+    handled = []
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_folder, args=(PollingWatcher(str(tmp_path)), handled.append),
+                              kwargs={"debounce": 0.5, "poll_interval": 0.02, "should_stop": stop.is_set})
+    thread.start()
+    try:
+        for i in range(5):  # Editor autosaves, each well within the debounce period of the last
+            note.write_text("draft" + "!" * (i + 1))
+            time.sleep(0.05)
+
+        deadline = time.monotonic() + 3.0
+        while not handled and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.6)  # Long enough for a second batch to show up if the burst was split
+    finally:
+        stop.set()
+        thread.join()
+
+    assert handled == [[str(note)]]
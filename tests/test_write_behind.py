@@ -0,0 +1,67 @@
+import threading
+import pytest
+from unittest.mock import patch
+from scripts.write_behind import WriteBehind
+from scripts.process_notes import process_folder
+
+
+def test_writes_are_applied_in_order_and_coalesced(tmp_path):
+    release = threading.Event()
+    applied = []
+    done = []
+
+    def write(name, value, wait=False):
+        def apply():
+            if wait:
+                release.wait(5)
+            applied.append((name, value))
+            return value
+        return apply
+
+    writer = WriteBehind()
+    writer.submit(tmp_path / "a.md", write("a", 1, wait=True), on_done=done.append)  # Holds up the writer thread
+    writer.submit(tmp_path / "b.md", write("b", 1), on_done=done.append)
+    writer.submit(tmp_path / "c.md", write("c", 1), on_done=done.append)
+    writer.submit(tmp_path / "b.md", write("b", 2), on_done=done.append)
+    release.set()
+    writer.close()
+
+    assert applied == [("a", 1), ("b", 2), ("c", 1)]
+    assert done == [1, 2, 1]
+    assert writer.coalesced == 1
+
+
+def test_failures_reach_the_error_callback(tmp_path):
+    errors = []
+
+    def fail():
+        raise OSError("disk full")
+
+    writer = WriteBehind()
+    writer.submit(tmp_path / "a.md", fail, on_error=errors.append)
+    writer.close()
+
+    assert [str(e) for e in errors] == ["disk full"]
+    with pytest.raises(RuntimeError):
+        writer.submit(tmp_path / "a.md", fail)
+
+
+def test_process_folder_with_write_behind(tmp_path):
+    notes_dir = tmp_path / "notes"
+    notes_dir.mkdir()
+    for name in ("a.md", "b.md", "c.md"):
+        (notes_dir / name).write_text(f"Body of {name}")
+    args = (str(notes_dir), "reference", "prompt", set(), True, False, True, tmp_path / "log.txt", tmp_path / "new_tags.txt")
+    manifest_file = str(tmp_path / "manifest.json")
+
+    with patch("scripts.process_notes.write_updated_file", side_effect=OSError("read-only")) as mock_write:
+        failed = process_folder(*args, manifest_file=manifest_file, write_behind=True)
+    assert mock_write.call_count == 3
+    assert failed["errors"] == 3 and "processed" not in failed
+
+    stats = process_folder(*args, manifest_file=manifest_file, write_behind=True)
+    assert stats["written"] == 3 and stats["processed"] == 3
+    assert (notes_dir / "a.md").read_text().endswith("---\n\nBody of a.md")
+
+    rerun = process_folder(*args, manifest_file=manifest_file, write_behind=True)
+    assert rerun["unchanged"] == 3  # Manifest entries were recorded from the writer's callbacks
@@ -0,0 +1,49 @@
+import glob
+import os
+import pytest
+import yaml
+from scripts import yaml_codec
+from scripts.file_utils import find_frontmatter, render_note
+
+NOTES_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "notes")
+NOTE_PATHS = sorted(glob.glob(os.path.join(NOTES_ROOT, "**", "*.md"), recursive=True))
+
+
+def test_load_and_dump_round_trip():
+    metadata = {"tags": ["AI", "Über"], "category": "Machine Learning", "aliases": []}
+    text = yaml_codec.dump(metadata)
+    assert text.startswith("tags:\n- AI\n")
+    assert yaml_codec.load(text) == metadata
+    assert yaml_codec.dump(metadata, sort_keys=True).startswith("aliases: []\n")
+
+
+def test_load_rejects_unsafe_tags():
+    with pytest.raises(yaml.YAMLError):
+        yaml_codec.load("!!python/object/apply:os.system ['true']")
+
+
+@pytest.mark.skipif(not NOTE_PATHS, reason="no notes in the repository")
+def test_parity_with_pure_python_yaml_on_repo_notes():
+    """Every header in notes/ must load to the same data and render to the same bytes as plain PyYAML."""
+    checked = 0
+    for path in NOTE_PATHS:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        span = find_frontmatter(content)
+        if span is None:
+            continue
+        header = content[span[0]:span[1]]
+        try:
+            expected = yaml.safe_load(header)
+        except yaml.YAMLError:
+            with pytest.raises(yaml.YAMLError):
+                yaml_codec.load(header)
+            continue
+
+        assert yaml_codec.load(header) == expected, path
+        if isinstance(expected, dict):
+            body = content[span[2]:].strip()
+            pure = yaml.dump(expected, default_flow_style=False, sort_keys=False).strip()
+            assert render_note(expected, body).encode("utf-8") == f"---\n{pure}\n---\n\n{body}".encode("utf-8"), path
+        checked += 1
+    assert checked
@@ -0,0 +1,108 @@
+"""
+Benchmark the single-pass frontmatter scanner (`find_frontmatter`) against the
+previous `content.split("---", 2)` implementation of `extract_yaml_header`.
+
+Run from the project root:
+
+    python -m utils.benchmark_frontmatter [notes_dir] [--repeat N]
+
+Both implementations are timed on the same in-memory copies of every `.md` note,
+first for locating the header alone and then including `yaml.safe_load`. Notes
+where the two disagree are listed, since the old split misreads `---` rules in
+bodies and ignores BOM/CRLF delimiters.
+"""
+
+import os
+import sys
+import time
+import argparse
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.file_utils import find_frontmatter, extract_yaml_header  # noqa: E402
+
+DEFAULT_NOTES_DIR = os.path.join("notes", "standardised")
+
+
+def split_locate(content):
+    """Header location as done by the old implementation (without parsing)."""
+    if content.startswith("---"):
+        parts = content.split("---", 2)
+        if len(parts) > 2:
+            return parts[1], parts[2].strip()
+    return None, content.strip()
+
+
+def split_extract(content):
+    """The old `extract_yaml_header`."""
+    if content.startswith("---"):
+        parts = content.split("---", 2)
+        if len(parts) > 2:
+            return yaml.safe_load(parts[1]), parts[2].strip()
+    return None, content.strip()
+
+
+def scan_locate(content):
+    span = find_frontmatter(content)
+    if span is None:
+        return None, content.strip()
+    header_start, header_end, body_start = span
+    return content[header_start:header_end], content[body_start:].strip()
+
+
+def time_it(func, contents, repeat):
+    """Return the best wall time, in seconds, of running `func` over every note."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            try:
+                func(content)
+            except yaml.YAMLError:
+                pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frontmatter extraction.")
+    parser.add_argument("notes_dir", nargs="?", default=DEFAULT_NOTES_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(args.notes_dir)
+        for name in files if name.endswith(".md")
+    )
+    contents = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            contents.append(f.read().strip())
+    total_bytes = sum(len(c) for c in contents)
+    print(f"{len(contents)} notes, {total_bytes / 1024:.0f} KiB from {args.notes_dir}")
+
+    for label, old, new in (
+        ("locate header", split_locate, scan_locate),
+        ("locate + safe_load", split_extract, extract_yaml_header),
+    ):
+        old_time = time_it(old, contents, args.repeat)
+        new_time = time_it(new, contents, args.repeat)
+        print(f"{label:20s} split: {old_time * 1000:8.2f} ms   scan: {new_time * 1000:8.2f} ms   "
+              f"speedup: {old_time / new_time:5.2f}x")
+
+    differing = []
+    for path, content in zip(paths, contents):
+        try:
+            same = split_extract(content) == extract_yaml_header(content)
+        except yaml.YAMLError:
+            same = False
+        if not same:
+            differing.append(path)
+    print(f"{len(differing)} notes where the parsed header or body differ")
+    for path in differing:
+        print(f"  {path}")
+
+
+if __name__ == "__main__":
+    main()